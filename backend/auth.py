@@ -1,7 +1,19 @@
 import bcrypt
-from jose import jwt
-from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import jwt, JWTError
+from datetime import datetime, timedelta, timezone
 from typing import Optional
+from backend.config import settings
+from backend.database import get_async_database
 
 # Configuration
 import os
@@ -17,9 +29,79 @@ def verify_password(plain_password, hashed_password):
         hashed_password = hashed_password.encode('utf-8')
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password)
 
-def get_password_hash(password):
+def get_password_hash(password, rounds: Optional[int] = None):
     # bcrypt.hashpw returns bytes, we decode to store as string
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    salt = bcrypt.gensalt(rounds=rounds or settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """ Cost factor of a stored bcrypt hash ("$2b$12$..." -> 12). """
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed_password: str) -> bool:
+    return hash_rounds(hashed_password) != settings.BCRYPT_ROUNDS
+
+# --- Dedicated hashing pool ---
+# bcrypt is deliberately slow (~250ms at cost 12). Running it on Starlette's
+# shared threadpool lets a login burst starve every other sync endpoint, so
+# hashing gets its own bounded pool and the auth handlers await it.
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+_pending = 0
+
+def _get_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            try:
+                _hash_pool = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            except (OSError, NotImplementedError) as e:
+                # e.g. serverless runtimes without /dev/shm; bcrypt releases the GIL so threads still scale
+                print(f"[Auth] Process pool unavailable ({e}), hashing on a dedicated thread pool")
+                _hash_pool = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        return _hash_pool
+
+async def _run_in_hash_pool(fn, *args):
+    global _pending
+    with _hash_pool_lock:
+        if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins in progress, please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+    try:
+        return await asyncio.wrap_future(_get_hash_pool().submit(fn, *args))
+    finally:
+        with _hash_pool_lock:
+            _pending -= 1
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    return await _run_in_hash_pool(get_password_hash, password, settings.BCRYPT_ROUNDS)
+
+async def rehash_if_needed(collection, user: dict, plain_password: str):
+    """ After a successful login, migrates a hash made with a different cost. """
+    if "_id" in user and needs_rehash(user.get("password_hash")):
+        new_hash = await get_password_hash_async(plain_password)
+        await collection.update_one({"_id": user["_id"]}, {"$set": {"password_hash": new_hash}})
+
+def shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -27,6 +109,125 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+# --- Token verification ---
+# Decoded claims are cached in a bounded LRU keyed by the token's hash until
+# the token expires, and revocations live in an in-memory set refreshed from
+# Mongo, so a request normally pays neither a signature check nor a DB lookup.
+
+REVOKED_TOKENS_COLLECTION = "revoked_tokens"
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+_claims_cache = OrderedDict() # token hash -> claims
+_claims_cache_lock = threading.Lock()
+
+_revoked = set()
+_revoked_state = {"loaded_at": 0.0}
+_revoked_refresh_lock = None
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _revocation_key(claims: dict, token_hash: str) -> str:
+    # Tokens issued before jti was added can only be revoked by their hash
+    return claims.get("jti") or token_hash
+
+def _unauthorized(detail: str):
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def decode_token(token: str) -> dict:
+    """ Validates signature and expiry, serving repeat tokens from the LRU. """
+    token_hash = _token_hash(token)
+    now = time.time()
+
+    with _claims_cache_lock:
+        claims = _claims_cache.get(token_hash)
+        if claims is not None:
+            if claims["exp"] > now:
+                _claims_cache.move_to_end(token_hash)
+                return claims
+            del _claims_cache[token_hash]
+
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise _unauthorized("Invalid or expired token")
+    if "exp" not in claims or "sub" not in claims:
+        raise _unauthorized("Invalid token")
+    claims["_token_hash"] = token_hash
+
+    with _claims_cache_lock:
+        _claims_cache[token_hash] = claims
+        while len(_claims_cache) > settings.TOKEN_CACHE_SIZE:
+            _claims_cache.popitem(last=False)
+    return claims
+
+async def refresh_revocations(force: bool = False):
+    """ Reloads still-unexpired revocations from Mongo at most every REVOCATION_REFRESH_SECONDS. """
+    global _revoked, _revoked_refresh_lock
+    if not force and time.monotonic() - _revoked_state["loaded_at"] < settings.REVOCATION_REFRESH_SECONDS:
+        return
+    if _revoked_refresh_lock is None:
+        _revoked_refresh_lock = asyncio.Lock()
+
+    async with _revoked_refresh_lock:
+        # Another request may have refreshed while we waited
+        if not force and time.monotonic() - _revoked_state["loaded_at"] < settings.REVOCATION_REFRESH_SECONDS:
+            return
+        database = get_async_database()
+        cursor = database[REVOKED_TOKENS_COLLECTION].find(
+            {"exp": {"$gt": datetime.now(timezone.utc)}}, {"_id": 0, "key": 1}
+        )
+        _revoked = {doc["key"] async for doc in cursor}
+        _revoked_state["loaded_at"] = time.monotonic()
+
+async def revoke_token(claims: dict):
+    """ Revokes a token until its own expiry; the TTL index cleans the row up afterwards. """
+    key = _revocation_key(claims, claims["_token_hash"])
+    _revoked.add(key)
+    database = get_async_database()
+    await database[REVOKED_TOKENS_COLLECTION].update_one(
+        {"key": key},
+        {"$set": {"key": key, "sub": claims.get("sub"), "exp": datetime.fromtimestamp(claims["exp"], tz=timezone.utc)}},
+        upsert=True
+    )
+
+async def _claims_for(credentials: Optional[HTTPAuthorizationCredentials]) -> Optional[dict]:
+    if credentials is None or not credentials.credentials:
+        return None
+    claims = decode_token(credentials.credentials)
+    await refresh_revocations()
+    if _revocation_key(claims, claims["_token_hash"]) in _revoked:
+        raise _unauthorized("Token has been revoked")
+    return claims
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> dict:
+    """ Dependency: decoded claims of a valid bearer token, else 401. """
+    claims = await _claims_for(credentials)
+    if claims is None:
+        raise _unauthorized("Not authenticated")
+    return claims
+
+async def get_optional_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> Optional[dict]:
+    """ Dependency: like get_current_user, but None when no token was sent. """
+    return await _claims_for(credentials)
+
+def authorize_email(user: Optional[dict], email: str):
+    """
+    Checks the caller may act on `email`: its own account, or any account for
+    admins. Anonymous calls pass unless AUTH_REQUIRED is on (MVP rollout).
+    """
+    if user is None:
+        if settings.AUTH_REQUIRED:
+            raise _unauthorized("Not authenticated")
+        return
+    if user.get("role") != "admin" and user.get("sub") != email:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed for this account")
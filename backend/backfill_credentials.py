@@ -0,0 +1,39 @@
+from pymongo import UpdateOne
+from backend.database import get_database
+from backend.services.auth_service import CREDENTIALS_COLLECTION, PROFILE_COLLECTIONS
+
+def backfill_credentials(batch_size=500):
+    """
+    Copies password hashes and verification flags from the profile collections
+    into `credentials`. Existing credential rows are left untouched, so it is
+    safe to re-run; login also migrates any account it finds missing.
+    """
+    db = get_database()
+
+    for role, col_name in PROFILE_COLLECTIONS.items():
+        ops = []
+        copied = 0
+        cursor = db[col_name].find(
+            {"password_hash": {"$exists": True}},
+            {"email": 1, "password_hash": 1, "isVerified": 1, "_id": 0}
+        )
+        for profile in cursor:
+            ops.append(UpdateOne(
+                {"email": profile["email"], "role": role},
+                {"$setOnInsert": {
+                    "email": profile["email"],
+                    "role": role,
+                    "password_hash": profile["password_hash"],
+                    "isVerified": profile.get("isVerified", False)
+                }},
+                upsert=True
+            ))
+            if len(ops) >= batch_size:
+                copied += db[CREDENTIALS_COLLECTION].bulk_write(ops, ordered=False).upserted_count
+                ops = []
+        if ops:
+            copied += db[CREDENTIALS_COLLECTION].bulk_write(ops, ordered=False).upserted_count
+        print(f"{role}: {copied} credentials created from '{col_name}'")
+
+if __name__ == "__main__":
+    backfill_credentials()
@@ -0,0 +1,15 @@
+from backend.database import get_database
+from backend.services.score_ledger import backfill_ledger, LEDGER_COLLECTION
+
+def run_backfill():
+    db = get_database()
+    print(f"Backfilling '{LEDGER_COLLECTION}' from per-round result collections...")
+
+    counts = backfill_ledger(db)
+    for col_name, count in counts.items():
+        print(f"  {col_name}: {count} rows")
+
+    print(f"Done. Ledger now holds {db[LEDGER_COLLECTION].count_documents({})} rows.")
+
+if __name__ == "__main__":
+    run_backfill()
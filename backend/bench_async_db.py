@@ -0,0 +1,67 @@
+"""
+Requests-per-second benchmark for the hot GD / scores endpoints.
+
+Run it once against a server on the old (sync pymongo) build and once against
+the async build, then compare:
+
+    python bench_async_db.py http://localhost:8000 http://localhost:9000
+
+With a single URL it just reports that server. 200 concurrent clients by default.
+"""
+import sys
+import time
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+CONCURRENCY = 200
+REQUESTS_PER_CLIENT = 25
+
+SESSION_ID = "bench-session"
+ROOM_ID = "bench-room"
+EMAIL = "abc@gmail.com"
+
+PATHS = [
+    f"/gd-transcript/{SESSION_ID}?roomId={ROOM_ID}",
+    f"/scores/student/{EMAIL}",
+    f"/gd-session/my-room?sessionId={SESSION_ID}&participantId=bench-participant",
+]
+
+
+def client(base_url, worker_idx):
+    ok = 0
+    failed = 0
+    for i in range(REQUESTS_PER_CLIENT):
+        path = PATHS[(worker_idx + i) % len(PATHS)]
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=30) as resp:
+                resp.read()
+                ok += 1
+        except urllib.error.HTTPError:
+            # 404s still exercise the DB lookup, count them as served
+            ok += 1
+        except Exception:
+            failed += 1
+    return ok, failed
+
+
+def run(base_url):
+    print(f"Benchmarking {base_url} with {CONCURRENCY} concurrent clients...")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        results = list(pool.map(lambda idx: client(base_url, idx), range(CONCURRENCY)))
+    elapsed = time.perf_counter() - start
+
+    ok = sum(r[0] for r in results)
+    failed = sum(r[1] for r in results)
+    rps = ok / elapsed if elapsed else 0
+    print(f"  served={ok} failed={failed} elapsed={elapsed:.2f}s rps={rps:.1f}")
+    return rps
+
+
+if __name__ == "__main__":
+    urls = sys.argv[1:] or ["http://localhost:8000"]
+    rates = [run(url) for url in urls]
+
+    if len(rates) == 2 and rates[0]:
+        print(f"\nBefore: {rates[0]:.1f} rps  After: {rates[1]:.1f} rps  ({rates[1] / rates[0]:.2f}x)")
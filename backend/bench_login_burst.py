@@ -0,0 +1,91 @@
+"""
+Login throughput under a burst of simultaneous sign-ins, plus the latency of
+an unrelated endpoint measured during the burst (it should stay flat now that
+bcrypt runs on its own pool instead of Starlette's threadpool).
+
+    python bench_login_burst.py [base_url] [users]
+
+Registers bench users on first run (that is itself a hashing burst).
+"""
+import sys
+import json
+import time
+import threading
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000"
+USERS = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+PASSWORD = "bench-password"
+
+def post(path, payload):
+    req = urllib.request.Request(
+        BASE_URL + path,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception:
+        return None
+
+def email_for(i):
+    return f"bench-user-{i}@example.com"
+
+def register(i):
+    return post("/student/register", {"email": email_for(i), "password": PASSWORD, "fullName": f"Bench {i}"})
+
+def login(i):
+    start = time.perf_counter()
+    code = post("/student/login", {"email": email_for(i), "password": PASSWORD})
+    return code, time.perf_counter() - start
+
+def probe_health(stop, samples):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(BASE_URL + "/healthz", timeout=30) as resp:
+                resp.read()
+            samples.append(time.perf_counter() - start)
+        except Exception:
+            pass
+        time.sleep(0.05)
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+if __name__ == "__main__":
+    print(f"Registering {USERS} bench users (400 = already registered)...")
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        codes = list(pool.map(register, range(USERS)))
+    print(f"  {codes.count(200)} created, {codes.count(400)} existing")
+
+    stop = threading.Event()
+    health_samples = []
+    prober = threading.Thread(target=probe_health, args=(stop, health_samples))
+    prober.start()
+
+    print(f"Firing {USERS} simultaneous logins...")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=USERS) as pool:
+        results = list(pool.map(login, range(USERS)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    prober.join()
+
+    ok = [lat for code, lat in results if code == 200]
+    rejected = len([1 for code, _ in results if code == 503])
+    print(f"  ok={len(ok)} rejected(503)={rejected} failed={USERS - len(ok) - rejected}")
+    print(f"  elapsed={elapsed:.2f}s throughput={len(ok) / elapsed:.1f} logins/s")
+    print(f"  login p50={percentile(ok, 0.5) * 1000:.0f}ms p95={percentile(ok, 0.95) * 1000:.0f}ms")
+    print(f"  /healthz during burst: p50={percentile(health_samples, 0.5) * 1000:.0f}ms "
+          f"p95={percentile(health_samples, 0.95) * 1000:.0f}ms ({len(health_samples)} samples)")
@@ -0,0 +1,42 @@
+"""
+Compares bytes returned per query with and without the named projections in
+backend/repository.py. Reads a sample of real documents, so point MONGODB_URI
+at a database with some rooms and students in it.
+
+    python bench_projections.py [sample_size]
+"""
+import sys
+import bson
+from backend.database import get_database
+from backend.repository import PROJECTIONS
+
+SAMPLE_SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+# use case -> (collection, projection name, key used to re-query the same doc)
+CASES = [
+    ("verification list", "students", "verification_card", "_id"),
+    ("profile card", "students", "profile_card", "_id"),
+    ("login", "students", "login", "_id"),
+    ("room summary", "rooms", "room_summary", "_id"),
+    ("script cursor", "rooms", "script_cursor", "_id"),
+]
+
+def run():
+    db = get_database()
+    print(f"{'use case':<20}{'docs':>6}{'full bytes':>14}{'projected':>14}{'saved':>9}")
+
+    for label, col_name, projection_name, key in CASES:
+        full_total = 0
+        projected_total = 0
+        docs = list(db[col_name].find({}).limit(SAMPLE_SIZE))
+
+        for doc in docs:
+            full_total += len(bson.encode(doc))
+            projected = db[col_name].find_one({key: doc[key]}, PROJECTIONS[projection_name])
+            projected_total += len(bson.encode(projected or {}))
+
+        saved = (1 - projected_total / full_total) * 100 if full_total else 0
+        print(f"{label:<20}{len(docs):>6}{full_total:>14}{projected_total:>14}{saved:>8.1f}%")
+
+if __name__ == "__main__":
+    run()
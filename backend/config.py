@@ -7,6 +7,83 @@ class Settings(BaseSettings):
     MONGODB_URI: Optional[str] = os.getenv("MONGODB_URI") 
     MONGO_URI: Optional[str] = os.getenv("MONGODB_URI") # Alias for compatibility
     
+    # MongoDB connection pool (applies to both the sync and async clients)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None # None = wait forever for a free connection
+    MONGO_SOCKET_TIMEOUT_MS: Optional[int] = None
+    MONGO_CONNECT_TIMEOUT_MS: int = 20000
+    
+    # Password hashing (bcrypt cost and the dedicated hashing pool)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 500 # Queued + running; beyond this auth returns 503
+    
+    # Token verification
+    AUTH_REQUIRED: bool = False # When False, endpoints still accept calls without a bearer token
+    TOKEN_CACHE_SIZE: int = 10000
+    REVOCATION_REFRESH_SECONDS: int = 30
+    
+    # /admin/stats counters cache
+    STATS_CACHE_TTL_SECONDS: int = 30
+    
+    # GD bot pacing: pause before a bot speaks after the last trigger
+    AI_TURN_DELAY_SECONDS: float = 7.0
+    AI_TURN_LEASE_SECONDS: int = 15 # Cross-worker room lease; a crashed holder blocks the room this long
+    
+    # Live transcript push (SSE)
+    TRANSCRIPT_HEARTBEAT_SECONDS: int = 15
+    TRANSCRIPT_CHANGE_STREAM: bool = False # Feed pushes from a Mongo change stream (needed with several workers)
+    TRANSCRIPT_ACTIVITY_CACHE_SECONDS: float = 2.0 # How long a cached room tail (ETag, silence breaker) is trusted
+    TRANSCRIPT_ACTIVITY_CACHE_SIZE: int = 10000 # Rooms whose tail is cached per worker (LRU)
+    INTERIM_FLUSH_SECONDS: float = 5.0 # Buffered interim speech with no final result is persisted after this
+    
+    # GD lobby
+    LOBBY_SEAT_CAP: int = 5
+    LOBBY_JOIN_CUTOFF_SECONDS: int = 5 # Sessions starting sooner than this take no new seats
+    LOBBY_SLOT_SECONDS: int = 60 # Joins in one bucket that all miss share a new session's slot
+    SESSION_RESYNC_SECONDS: int = 30 # Re-read waiting sessions (restarts, other workers) this often
+    REQUEST_PATH_FALLBACK: bool = False # /status and lobby streams start overdue sessions (no reliable background tasks)
+    LOBBY_STREAM_RECHECK_SECONDS: float = 2.0 # Lobby stream DB re-read once startTime has passed
+    
+    # Room allocation job queue
+    ALLOCATION_MAX_JOBS: int = 2 # Jobs run concurrently per worker
+    ALLOCATION_ROOM_CONCURRENCY: int = 10 # Rooms built in parallel (executor size)
+    ALLOCATION_LEASE_SECONDS: int = 60 # A job whose heartbeat stops is re-claimed after this
+    ALLOCATION_HEARTBEAT_SECONDS: int = 15
+    ALLOCATION_POLL_SECONDS: int = 5
+    ALLOCATION_MAX_ATTEMPTS: int = 3
+    ALLOCATION_RETRY_SECONDS: int = 10 # Linear backoff between attempts
+    
+    # Background GD evaluation
+    EVALUATION_MAX_JOBS: int = 2 # Room evaluations run concurrently per worker
+    EVALUATION_LEASE_SECONDS: int = 180
+    EVALUATION_POLL_SECONDS: int = 5
+    EVALUATION_MAX_ATTEMPTS: int = 3
+    EVALUATION_RETRY_SECONDS: int = 30 # Linear backoff between attempts
+    EVALUATION_INACTIVITY_SECONDS: int = 300 # A room this quiet is evaluated without waiting for the script to end
+    EVALUATION_SWEEP_SECONDS: int = 60
+    EVALUATION_SWEEP_WINDOW_HOURS: int = 24 # Only rooms created this recently are swept
+    EVALUATION_SWEEP_BATCH: int = 50
+    EVALUATION_WAIT_SECONDS: float = 90.0 # /evaluate waits this long for a running evaluation, then answers 202
+    EVALUATION_PROMPT_TOKEN_BUDGET: int = 3000 # Estimated transcript tokens per prompt; student lines are always kept
+    EVALUATION_OTHER_LINE_TOKENS: int = 80 # Bot / other speakers' merged lines are cut to this
+    
+    # Pre-generated GD script pool
+    SCRIPT_POOL_ENABLED: bool = True
+    SCRIPT_POOL_SIZE: int = 3 # Ready scripts kept per GD topic
+    SCRIPT_POOL_REFILL_SECONDS: int = 60
+    SCRIPT_POOL_CONCURRENCY: int = 2 # Topics generated in parallel by the replenisher
+    SCRIPT_POOL_LEASE_SECONDS: int = 120 # One worker refills at a time; renewed before every generation
+    SCRIPT_MIN_TURNS: int = 10 # Pooled scripts shorter than this are discarded
+    
+    # Streamed generation on a pool miss: the room starts once the first turns exist
+    SCRIPT_STREAMING: bool = True
+    SCRIPT_STREAM_FIRST_TURNS: int = 2
+    SCRIPT_STREAM_FIRST_TIMEOUT_SECONDS: float = 20.0
+    SCRIPT_FRONTIER_POLL_SECONDS: float = 1.0 # Bot turn retry when it has caught up with a streaming script
+    SCRIPT_STREAM_STALL_SECONDS: int = 60 # A streaming script with no push for this long is closed at its current length
+    
     # AI Keys
     AI_API_KEYS: Optional[str] = os.getenv("AI_API_KEYS")
     
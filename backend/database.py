@@ -1,6 +1,8 @@
 import os
-from pymongo import MongoClient
+from pymongo import MongoClient, AsyncMongoClient
 from pymongo.server_api import ServerApi
+from backend.config import settings
+from backend.pool_metrics import pool_metrics
 
 # Use environment variable for MongoDB URI, fallback to hardcoded only if provided in env or code
 # Get MongoDB URI from environment variable
@@ -10,13 +12,24 @@ if not URI:
     print("CRITICAL WARNING: MONGODB_URI is not set in environment variables.")
 
 
+def client_options(label: str) -> dict:
+    """ Pool / timeout options shared by the sync and async clients; `label` picks the pool metrics listener. """
+    return {
+        "server_api": ServerApi('1'),
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "event_listeners": [pool_metrics[label]],
+    }
 
 class Database:
     client: MongoClient = None
 
     def connect(self):
         if self.client is None:
-            self.client = MongoClient(URI, server_api=ServerApi('1'))
+            self.client = MongoClient(URI, **client_options("sync"))
             try:
                 self.client.admin.command('ping')
                 print("Pinged your deployment. You successfully connected to MongoDB!")
@@ -37,3 +50,32 @@ db = Database()
 
 def get_database():
     return db.get_db()
+
+
+class AsyncDatabase:
+    """
+    Async twin of `Database` for handlers running on the event loop.
+    Uses pymongo's native asyncio client, so awaiting a query yields the
+    loop instead of blocking the worker while Atlas answers.
+    """
+    client: AsyncMongoClient = None
+
+    def connect(self):
+        if self.client is None:
+            # No I/O here - the client connects lazily on the first awaited op
+            self.client = AsyncMongoClient(URI, **client_options("async"))
+
+    def get_db(self):
+        if self.client is None:
+            self.connect()
+        return self.client["mockello_mvp_db"]
+
+    async def close(self):
+        if self.client:
+            await self.client.close()
+            self.client = None
+
+async_db = AsyncDatabase()
+
+def get_async_database():
+    return async_db.get_db()
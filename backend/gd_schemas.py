@@ -27,10 +27,14 @@ class RoomModel(BaseModel):
     participants: List[str] = [] # List of peerIds
     aiCount: int = 0
     createdAt: datetime = Field(default_factory=datetime.utcnow)
+    transcriptRevision: int = 0 # Bumped when a transcript row's text is replaced; part of the polling ETag
+    lastTranscriptAt: datetime = Field(default_factory=datetime.utcnow) # Newest line's write time; the evaluation sweep finds quiet rooms by it
     
     # Scalable Bot Fields (Moved from SessionModel)
     script: List[dict] = [] # Stores [{"sentiment": "For", "text": "..."}]
     current_script_index: int = 0 
+    scriptComplete: bool = True # False while later turns are still streaming in
+    scriptStreamedAt: Optional[datetime] = None # Last streamed push; a stalled stream is closed after SCRIPT_STREAM_STALL_SECONDS
     isUserTalking: bool = False
     topic: str
 
@@ -40,6 +44,9 @@ class SessionModel(BaseModel):
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     startTime: Optional[datetime] = None
     endTime: Optional[datetime] = None
+    lobby: str = "default"
+    seats: int = 0 # Claimed lobby seats, capped at LOBBY_SEAT_CAP
+    slot: Optional[str] = None # "<bucket>:<n>" open-slot key, unique per lobby (see services/lobby.py)
     
     # Session is now just the LOBBY / Wrapper.
     # Actual GD state is in RoomModel.
@@ -50,7 +57,8 @@ class TranscriptEntry(BaseModel):
     speakerId: str # participantId or peerId
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     text: str
-    isFinal: bool = False # Web Speech API sends interim results
+    isFinal: Optional[bool] = None # Web Speech API sends interim results as False; omitted means final
+    utteranceId: Optional[str] = None # Client id of the utterance; makes the final write idempotent
 
 class CreateSessionRequest(BaseModel):
     topic: str
@@ -0,0 +1,253 @@
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+# Every collection that stores a per-student result row.
+RESULT_COLLECTIONS = [
+    "student_scores",
+    "mock_placement_results",
+    "tech_prep_results",
+    "aptitude_results",
+    "gd_results",
+    "technical_interview_results",
+    "ai_interview_results",
+]
+
+def _unique_email() -> IndexModel:
+    # Registration relies on this instead of checking the profile first; partial
+    # so it can be built next to the older non-unique email index
+    return IndexModel(
+        [("email", ASCENDING)],
+        name="email_unique",
+        unique=True,
+        partialFilterExpression={"email": {"$type": "string"}}
+    )
+
+
+# Declarative index registry: collection -> indexes the app's queries rely on.
+# `reconcile_indexes` creates whatever is missing at startup; anything on the
+# server that is not listed here is only reported, never dropped.
+INDEXES = {
+    "transcripts": [
+        # (timestamp, _id) ordering serves full fetches, `after` ranges and the room tail lookup
+        IndexModel([("sessionId", ASCENDING), ("roomId", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)], name="session_room_ts_id"),
+        IndexModel(
+            [("roomId", ASCENDING), ("speakerId", ASCENDING), ("utteranceId", ASCENDING)],
+            name="room_speaker_utterance",
+            partialFilterExpression={"utteranceId": {"$type": "string"}}
+        ),
+    ],
+    "participants": [
+        # Partial so it can be built next to the older non-unique session_participant before that is dropped
+        IndexModel(
+            [("sessionId", ASCENDING), ("participantId", ASCENDING)],
+            name="session_participant_unique",
+            unique=True,
+            partialFilterExpression={"participantId": {"$type": "string"}}
+        ),
+        IndexModel([("sessionId", ASCENDING), ("roomId", ASCENDING), ("role", ASCENDING)], name="session_room_role"),
+        IndexModel([("roomId", ASCENDING), ("role", ASCENDING)], name="room_role"),
+        IndexModel([("peerId", ASCENDING), ("sessionId", ASCENDING)], name="peer_session"),
+    ],
+    "rooms": [
+        IndexModel([("roomId", ASCENDING)], name="roomId"),
+        IndexModel([("evaluation.status", ASCENDING), ("evaluation.notBefore", ASCENDING)], name="evaluation_status"),
+        IndexModel([("lastTranscriptAt", ASCENDING), ("createdAt", ASCENDING)], name="lastTranscript_created"),
+    ],
+    "allocation_jobs": [
+        IndexModel([("sessionId", ASCENDING)], name="sessionId", unique=True),
+        IndexModel([("status", ASCENDING), ("createdAt", ASCENDING)], name="status_created"),
+    ],
+    "script_pool": [
+        IndexModel([("topic", ASCENDING), ("created_at", ASCENDING)], name="topic_created"),
+        IndexModel([("created_at", ASCENDING)], name="created_at"),
+    ],
+    "lobby_seats": [
+        IndexModel([("participantId", ASCENDING)], name="participantId", unique=True),
+        IndexModel([("lobby", ASCENDING)], name="lobby"),
+    ],
+    "sessions": [
+        IndexModel([("sessionId", ASCENDING)], name="sessionId"),
+        IndexModel([("status", ASCENDING)], name="status"),
+        IndexModel([("lobby", ASCENDING), ("status", ASCENDING), ("startTime", ASCENDING)], name="lobby_status_start"),
+        IndexModel(
+            [("lobby", ASCENDING), ("slot", ASCENDING)],
+            name="lobby_slot",
+            unique=True,
+            partialFilterExpression={"slot": {"$type": "string"}}
+        ),
+    ],
+    "students": [
+        _unique_email(),
+        IndexModel([("isVerified", ASCENDING), ("_id", ASCENDING)], name="isVerified_id"),
+    ],
+    "colleges": [
+        _unique_email(),
+        IndexModel([("isVerified", ASCENDING), ("_id", ASCENDING)], name="isVerified_id"),
+    ],
+    "companies": [
+        _unique_email(),
+        IndexModel([("isVerified", ASCENDING), ("_id", ASCENDING)], name="isVerified_id"),
+    ],
+    "admins": [
+        _unique_email(),
+    ],
+    "interview_results": [
+        IndexModel([("company_email", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], name="company_ts_id"),
+    ],
+    "credentials": [
+        IndexModel([("email", ASCENDING), ("role", ASCENDING)], name="email_role", unique=True),
+    ],
+    "revoked_tokens": [
+        IndexModel([("key", ASCENDING)], name="key", unique=True),
+        IndexModel([("exp", ASCENDING)], name="exp_ttl", expireAfterSeconds=0),
+    ],
+    "score_ledger": [
+        IndexModel([("student_email", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="student_created_id"),
+        IndexModel([("student_email", ASCENDING), ("round_type", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="student_round_created_id"),
+    ],
+}
+
+for _col in RESULT_COLLECTIONS:
+    INDEXES[_col] = [
+        IndexModel([("student_email", ASCENDING), ("created_at", DESCENDING)], name="student_created"),
+    ]
+
+# Room evaluations are looked up per (session, room, peer)
+INDEXES["gd_results"].append(
+    IndexModel([("session_id", ASCENDING), ("room_id", ASCENDING), ("peer_id", ASCENDING)], name="session_room_peer")
+)
+
+
+# Indexes earlier versions of the registry created that a newer entry
+# replaces; reconcile drops them by name (if still there and unregistered).
+RETIRED_INDEXES = {
+    "transcripts": ["session_room_ts"], # -> session_room_ts_id
+    "students": ["isVerified", "email"], # -> isVerified_id, email_unique
+    "colleges": ["isVerified", "email"],
+    "companies": ["isVerified", "email"],
+    "admins": ["email"],
+    "interview_results": ["company_ts"], # -> company_ts_id
+    "score_ledger": ["student_created", "student_round_created"], # -> *_id
+    "participants": ["participant_joined", "session_participant"], # -> lobby_seats, session_participant_unique
+    "rooms": ["createdAt"], # -> lastTranscript_created
+}
+
+# Index options that must match for an existing index to count as the registered one
+INDEX_OPTIONS = ("unique", "partialFilterExpression", "expireAfterSeconds")
+
+
+def _key_of(spec) -> tuple:
+    """ Normalises an index key document to a comparable tuple. """
+    return tuple((field, int(direction)) for field, direction in spec.items())
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _options_of(index: dict) -> tuple:
+    return tuple(bool(index.get(o)) if o == "unique" else _freeze(index.get(o)) for o in INDEX_OPTIONS)
+
+
+def _spec_of(index: dict) -> tuple:
+    return _key_of(index["key"]), _options_of(index)
+
+
+INDEX_NOT_FOUND = 27
+
+
+async def _drop(collection, name: str):
+    """ Drops an index; one another worker dropped first counts as dropped. """
+    try:
+        await collection.drop_index(name)
+    except OperationFailure as e:
+        if e.code != INDEX_NOT_FOUND:
+            raise
+
+
+async def reconcile_indexes(database) -> dict:
+    """
+    Creates registry indexes that are missing, drops superseded ones and
+    reports indexes on the server that the registry does not know about.
+    Indexes are matched on key pattern and options, not their name, so an
+    index someone created by hand under a different name is not duplicated.
+    An index whose key matches a registered one but whose options (e.g.
+    unique) differ is only dropped once the registered one exists - a
+    changed index therefore needs a new name. Retired indexes (see
+    RETIRED_INDEXES) are dropped once nothing registered is missing, so a
+    failed build never leaves the collection without its old index.
+    """
+    report = {"created": {}, "dropped": {}, "extra": {}, "errors": {}}
+
+    for col_name, models in INDEXES.items():
+        collection = database[col_name]
+        errors = []
+        try:
+            existing = await (await collection.list_indexes()).to_list()
+            present = {_spec_of(idx) for idx in existing}
+
+            created = []
+            for model in models:
+                if _spec_of(model.document) in present:
+                    continue
+                try:
+                    created += await collection.create_indexes([model])
+                    present.add(_spec_of(model.document))
+                except Exception as e:
+                    errors.append(f"{model.document['name']}: {e}")
+            if created:
+                report["created"][col_name] = created
+
+            registered = {_spec_of(m.document) for m in models}
+            built_keys = {key for key, _ in registered & present}
+            all_built = registered <= present
+            dropped = []
+            for idx in existing:
+                spec = _spec_of(idx)
+                if idx["name"] == "_id_" or spec in registered:
+                    continue
+                superseded = spec[0] in built_keys
+                retired = idx["name"] in RETIRED_INDEXES.get(col_name, []) and all_built
+                if superseded or retired:
+                    await _drop(collection, idx["name"])
+                    dropped.append(idx["name"])
+            if dropped:
+                report["dropped"][col_name] = dropped
+
+            extra = [
+                idx["name"] for idx in existing
+                if idx["name"] not in dropped and idx["name"] != "_id_" and _spec_of(idx) not in registered
+            ]
+            if extra:
+                report["extra"][col_name] = extra
+        except Exception as e:
+            errors.append(str(e))
+        if errors:
+            report["errors"][col_name] = "; ".join(errors)
+
+    return report
+
+
+async def index_usage(database) -> dict:
+    """ Returns `$indexStats` per registered collection: ops served and since when. """
+    usage = {}
+    for col_name in INDEXES:
+        cursor = await database[col_name].aggregate([{"$indexStats": {}}])
+        stats = await cursor.to_list()
+        usage[col_name] = [
+            {
+                "name": s["name"],
+                "key": s["key"],
+                "ops": s.get("accesses", {}).get("ops", 0),
+                "since": s.get("accesses", {}).get("since"),
+                "registered": s["name"] == "_id_" or any(
+                    _key_of(m.document["key"]) == _key_of(s["key"]) for m in INDEXES[col_name]
+                ),
+            }
+            for s in stats
+        ]
+    return usage
@@ -21,9 +21,45 @@ async def lifespan(app: FastAPI):
         print("[Backend] MongoDB connection successful!")
     except Exception as e:
         print(f"[Backend] MongoDB connection failed: {e}")
+    try:
+        from backend.database import get_async_database
+        from backend.indexes import reconcile_indexes
+        report = await reconcile_indexes(get_async_database())
+        print(f"[Backend] Indexes created: {report['created']}")
+        if report["extra"]:
+            print(f"[Backend] Unregistered indexes: {report['extra']}")
+        if report["errors"]:
+            print(f"[Backend] Index errors: {report['errors']}")
+    except Exception as e:
+        print(f"[Backend] Index reconciliation failed: {e}")
+    from backend.services.ai_agent import turn_scheduler
+    from backend.services.transcript_hub import transcript_hub
+    from backend.services.script_pool import script_pool
+    from backend.services.session_scheduler import session_scheduler
+    from backend.services.allocation_jobs import allocation_worker
+    from backend.services.interim_buffer import interim_buffer
+    from backend.services.evaluation_jobs import evaluation_worker
+    turn_scheduler.start()
+    transcript_hub.start()
+    script_pool.start()
+    session_scheduler.start()
+    allocation_worker.start()
+    interim_buffer.start()
+    evaluation_worker.start()
     yield
     # Shutdown
     print("[Backend] Shutting down...")
+    await session_scheduler.stop()
+    await allocation_worker.stop()
+    await interim_buffer.stop()
+    await evaluation_worker.stop()
+    await turn_scheduler.stop()
+    await transcript_hub.stop()
+    await script_pool.stop()
+    from backend.database import async_db
+    await async_db.close()
+    from backend.auth import shutdown_hash_pool
+    shutdown_hash_pool()
 
 app = FastAPI(title="Mockello MVP Backend", lifespan=lifespan)
 
@@ -45,6 +81,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include Routers
@@ -79,6 +116,12 @@ app.include_router(gd_transcript.router)
 from backend.routers import gd_evaluation
 app.include_router(gd_evaluation.router)
 
+from backend.routers import metrics
+app.include_router(metrics.router)
+
+from backend.routers import auth as auth_router
+app.include_router(auth_router.router)
+
 @app.get("/")
 def root():
     return {
@@ -94,6 +137,7 @@ def health_check():
 def fix_login():
     from backend.database import get_database
     from backend.auth import get_password_hash
+    from backend.services.auth_service import set_password_hash
     try:
         db = get_database()
         # Force ping
@@ -131,6 +175,10 @@ def fix_login():
             upsert=True
         )
         
+        # Login reads the credentials collection
+        for role in ["student", "college", "company", "admin"]:
+            set_password_hash(db, role, email, hashed)
+        
         return {
             "status": "success", 
             "message": "User abc@gmail.com reset to password '1234' for ALL roles.",
@@ -143,6 +191,7 @@ def fix_login():
 def fix_company():
     from backend.database import get_database
     from backend.auth import get_password_hash
+    from backend.services.auth_service import set_password_hash
     try:
         db = get_database()
         hashed = get_password_hash("1234")
@@ -153,6 +202,7 @@ def fix_company():
             {"$set": {"password_hash": hashed, "companyName": "Debug Company", "role": "company"}}, 
             upsert=True
         )
+        set_password_hash(db, "company", "abc@gmail.com", hashed)
         
         return {
             "status": "success", 
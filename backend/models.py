@@ -187,6 +187,8 @@ class AptitudeResult(BaseModel):
 class GDResult(BaseModel):
     student_email: str # Or peerId if anon, but email strictly preferred for history
     session_id: str
+    room_id: Optional[str] = None
+    peer_id: Optional[str] = None
     scores: Dict[str, float] # Participation, Creativity, etc.
     feedback: str
     strengths: List[str]
@@ -0,0 +1,174 @@
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pymongo import ASCENDING, DESCENDING
+
+# Keyset (cursor) pagination helpers shared by the list endpoints.
+# Pages are ordered by (sort_field, _id) - or just _id - and the `after` cursor
+# is an opaque token holding the last row's sort key, so every page is an
+# index range scan instead of a growing skip().
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def encode_cursor(doc: dict, sort_field: str = None) -> str:
+    payload = {"id": str(doc["_id"])}
+    if sort_field:
+        value = doc.get(sort_field)
+        if isinstance(value, datetime):
+            payload["dt"] = value.isoformat()
+        else:
+            payload["v"] = value
+    raw = json.dumps(payload, default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(after: str, sort_field: str = None):
+    """ Returns (value, ObjectId) for a cursor token, or raises a 400. """
+    try:
+        padded = after + "=" * (-len(after) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        last_id = ObjectId(payload["id"])
+        if "dt" in payload:
+            value = datetime.fromisoformat(payload["dt"])
+        else:
+            value = payload.get("v")
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if sort_field and "dt" not in payload and "v" not in payload:
+        raise HTTPException(status_code=400, detail="Cursor does not match this listing")
+    return value, last_id
+
+
+def sort_spec(sort_field: str = None, direction: int = ASCENDING) -> list:
+    if sort_field:
+        return [(sort_field, direction), ("_id", direction)]
+    return [("_id", direction)]
+
+
+def keyset_query(query: dict, after: str = None, sort_field: str = None, direction: int = ASCENDING) -> dict:
+    """ Narrows `query` to rows strictly after the cursor in the given order. """
+    if not after:
+        return query
+
+    value, last_id = decode_cursor(after, sort_field)
+    op = "$gt" if direction == ASCENDING else "$lt"
+
+    if not sort_field:
+        keyset = {"_id": {op: last_id}}
+    elif value is None:
+        # Rows missing the sort field sort before everything else ascending
+        # and after everything else descending
+        keyset = {"$or": [{sort_field: None, "_id": {op: last_id}}]}
+        if direction == ASCENDING:
+            keyset["$or"].append({sort_field: {"$ne": None}})
+    else:
+        keyset = {"$or": [
+            {sort_field: {op: value}},
+            {sort_field: value, "_id": {op: last_id}},
+        ]}
+        if direction == DESCENDING:
+            keyset["$or"].append({sort_field: None})
+
+    return {"$and": [query, keyset]} if query else keyset
+
+
+def _stringify_id(doc: dict) -> dict:
+    doc["_id"] = str(doc["_id"])
+    return doc
+
+
+def find_page(collection, query: dict, limit: int = None, after: str = None, sort_field: str = None,
+              direction: int = ASCENDING, projection: dict = None, shape=_stringify_id):
+    """
+    Sync pymongo page fetch. Returns (items, next_cursor); next_cursor is None
+    on the last page. With no `limit` the whole (remaining) result is returned.
+    """
+    cursor = collection.find(keyset_query(query, after, sort_field, direction), projection)
+    cursor = cursor.sort(sort_spec(sort_field, direction))
+    if limit:
+        cursor = cursor.limit(limit + 1)
+
+    docs = list(cursor)
+    next_cursor = None
+    if limit and len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+
+    return [shape(d) for d in docs], next_cursor
+
+
+async def find_page_async(collection, query: dict, limit: int = None, after: str = None, sort_field: str = None,
+                          direction: int = ASCENDING, projection: dict = None, shape=_stringify_id):
+    """ Same as `find_page` for the async client. """
+    cursor = collection.find(keyset_query(query, after, sort_field, direction), projection)
+    cursor = cursor.sort(sort_spec(sort_field, direction))
+    if limit:
+        cursor = cursor.limit(limit + 1)
+
+    docs = await cursor.to_list()
+    next_cursor = None
+    if limit and len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+
+    return [shape(d) for d in docs], next_cursor
+
+
+def _ndjson_line(doc: dict) -> bytes:
+    return (json.dumps(jsonable_encoder(doc)) + "\n").encode("utf-8")
+
+
+def stream_page(collection, query: dict, limit: int = None, after: str = None, sort_field: str = None,
+                direction: int = ASCENDING, projection: dict = None, shape=_stringify_id) -> StreamingResponse:
+    """
+    Streams rows as NDJSON straight off a sync cursor instead of building the
+    list in memory. When more rows remain past `limit`, the final line is
+    `{"next_cursor": "..."}`.
+    """
+    cursor = collection.find(keyset_query(query, after, sort_field, direction), projection)
+    cursor = cursor.sort(sort_spec(sort_field, direction))
+    if limit:
+        cursor = cursor.limit(limit + 1)
+
+    def generate():
+        sent = 0
+        last = None
+        for doc in cursor:
+            if limit and sent >= limit:
+                yield _ndjson_line({"next_cursor": encode_cursor(last, sort_field)})
+                break
+            last = {"_id": doc["_id"], sort_field: doc.get(sort_field)} if sort_field else {"_id": doc["_id"]}
+            yield _ndjson_line(shape(doc))
+            sent += 1
+        cursor.close()
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def stream_page_async(collection, query: dict, limit: int = None, after: str = None, sort_field: str = None,
+                      direction: int = ASCENDING, projection: dict = None, shape=_stringify_id) -> StreamingResponse:
+    """ Same as `stream_page` for the async client. """
+    cursor = collection.find(keyset_query(query, after, sort_field, direction), projection)
+    cursor = cursor.sort(sort_spec(sort_field, direction))
+    if limit:
+        cursor = cursor.limit(limit + 1)
+
+    async def generate():
+        sent = 0
+        last = None
+        async for doc in cursor:
+            if limit and sent >= limit:
+                yield _ndjson_line({"next_cursor": encode_cursor(last, sort_field)})
+                break
+            last = {"_id": doc["_id"], sort_field: doc.get(sort_field)} if sort_field else {"_id": doc["_id"]}
+            yield _ndjson_line(shape(doc))
+            sent += 1
+        await cursor.close()
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,124 @@
+import threading
+from collections import deque
+from pymongo import monitoring
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    CMAP listener that tracks how long requests wait for a pooled connection
+    and how full each pool is. Each client gets its own listener, so the sync
+    and async pools to one host are counted (and closed) separately.
+    """
+
+    def __init__(self, label: str, window: int = 1000):
+        self.label = label
+        self._lock = threading.Lock()
+        self._window = window
+        self.pools = {}
+
+    @staticmethod
+    def _key(address) -> str:
+        return f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+
+    def _pool(self, address):
+        key = self._key(address)
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = {
+                "open": 0,
+                "in_use": 0,
+                "waiting": 0,
+                "checkouts": 0,
+                "checkout_failures": 0,
+                "wait_total_ms": 0.0,
+                "wait_max_ms": 0.0,
+                "recent_waits": deque(maxlen=self._window),
+                "cleared": 0,
+            }
+            self.pools[key] = pool
+        return pool
+
+    # --- Pool lifecycle ---
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address)["cleared"] += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.pools.pop(self._key(event.address), None)
+
+    # --- Connection lifecycle ---
+    def connection_created(self, event):
+        with self._lock:
+            self._pool(event.address)["open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["open"] = max(0, pool["open"] - 1)
+
+    # --- Checkout / checkin ---
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._pool(event.address)["waiting"] += 1
+
+    def connection_checked_out(self, event):
+        wait_ms = (event.duration or 0) * 1000
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["waiting"] = max(0, pool["waiting"] - 1)
+            pool["in_use"] += 1
+            pool["checkouts"] += 1
+            pool["wait_total_ms"] += wait_ms
+            pool["wait_max_ms"] = max(pool["wait_max_ms"], wait_ms)
+            pool["recent_waits"].append(wait_ms)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["waiting"] = max(0, pool["waiting"] - 1)
+            pool["checkout_failures"] += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["in_use"] = max(0, pool["in_use"] - 1)
+
+    def snapshot(self) -> dict:
+        """ Point-in-time copy of every pool's counters, safe to serialise. """
+        with self._lock:
+            result = {}
+            for key, pool in self.pools.items():
+                waits = sorted(pool["recent_waits"])
+                p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+                result[key] = {
+                    "open": pool["open"],
+                    "in_use": pool["in_use"],
+                    "waiting": pool["waiting"],
+                    "checkouts": pool["checkouts"],
+                    "checkout_failures": pool["checkout_failures"],
+                    "wait_avg_ms": round(pool["wait_total_ms"] / pool["checkouts"], 3) if pool["checkouts"] else 0.0,
+                    "wait_p95_ms": round(p95, 3),
+                    "wait_max_ms": round(pool["wait_max_ms"], 3),
+                    "cleared": pool["cleared"],
+                }
+            return result
+
+
+# client label -> listener; see `database.client_options`
+pool_metrics = {label: PoolMetricsListener(label) for label in ("sync", "async")}
+
+
+def pool_snapshot() -> dict:
+    """ Every client's pools: {label: {address: counters}}. """
+    return {label: listener.snapshot() for label, listener in pool_metrics.items()}
@@ -0,0 +1,67 @@
+from backend.models import StudentResponse
+
+# Named projections per use case, so each query only ships the fields its
+# caller reads. Every helper takes the database handle and returns whatever
+# the driver returns: a document for `db.get_db()`, an awaitable for
+# `async_db.get_db()` - so the same helper serves sync and async routers.
+
+PROJECTIONS = {
+    # Existence checks (register, optional profile lookups)
+    "exists": {"_id": 1},
+
+    # Login only needs the hash and the verification flag
+    "login": {"email": 1, "password_hash": 1, "isVerified": 1},
+
+    # /student/me - everything StudentResponse renders, never the password hash
+    "profile_card": {field: 1 for field in StudentResponse.model_fields if field != "id"},
+
+    # College verification queue rows
+    "verification_card": {
+        "fullName": 1, "email": 1, "registerNumber": 1, "degree": 1, "branch": 1, "cgpa": 1,
+        "skills": 1, "mobileNumber": 1, "internshipExperience": 1, "isVerified": 1,
+    },
+
+    # /gd-session/my-room
+    "participant_room": {"_id": 0, "roomId": 1},
+    "room_summary": {"_id": 0, "roomId": 1, "participants": 1, "aiCount": 1},
+
+    # AI turn loop: the next script line only, not the whole script array
+    "script_cursor": {
+        "_id": 0,
+        "sessionId": 1,
+        "current_script_index": 1,
+        "isUserTalking": 1,
+        "scriptComplete": {"$ifNull": ["$scriptComplete", True]},
+        "scriptStreamedAt": {"$ifNull": ["$scriptStreamedAt", "$createdAt"]},
+        "script_length": {"$size": {"$ifNull": ["$script", []]}},
+        "next_turn": {"$arrayElemAt": [{"$ifNull": ["$script", []]}, {"$ifNull": ["$current_script_index", 0]}]},
+    },
+
+    "participant_peer": {"_id": 0, "peerId": 1},
+    "participant_email": {"_id": 0, "email": 1},
+    "participant_eval": {"_id": 0, "peerId": 1, "email": 1, "role": 1},
+    "waiting_human": {"_id": 1, "peerId": 1},
+}
+
+
+def exists(collection, query: dict):
+    return collection.find_one(query, PROJECTIONS["exists"])
+
+def find_login(collection, email: str):
+    return collection.find_one({"email": email}, PROJECTIONS["login"])
+
+def find_student_profile(database, email: str):
+    return database["students"].find_one({"email": email}, PROJECTIONS["profile_card"])
+
+def find_participant_room(database, session_id: str, participant_id: str):
+    return database["participants"].find_one(
+        {"sessionId": session_id, "participantId": participant_id},
+        PROJECTIONS["participant_room"]
+    )
+
+def find_room_summary(database, room_id: str):
+    return database["rooms"].find_one({"roomId": room_id}, PROJECTIONS["room_summary"])
+
+def find_script_cursor(database, room_id: str):
+    """ Room state plus the single script line at `current_script_index` (or None). """
+    return database["rooms"].find_one({"roomId": room_id}, PROJECTIONS["script_cursor"])
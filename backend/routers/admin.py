@@ -1,101 +1,96 @@
-from fastapi import APIRouter, HTTPException, status
-from backend.database import get_database
+from fastapi import APIRouter, HTTPException, status, Query, Response
+from backend.database import get_database, get_async_database
+from backend.indexes import index_usage
+from backend.pagination import find_page, stream_page, NEXT_CURSOR_HEADER
+from backend.services import counters, auth_service
 from backend.models import AdminCreate, UserLogin, Token
-from backend.auth import get_password_hash, verify_password, create_access_token
+from backend.auth import create_access_token
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 @router.post("/register")
-def register_admin(admin: AdminCreate):
+async def register_admin(admin: AdminCreate):
     # This should probably be protected or removed in prod
-    db = get_database()
-    
-    if db.admins.find_one({"email": admin.email}):
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
     admin_dict = admin.dict()
-    admin_dict["password_hash"] = get_password_hash(admin.password)
     del admin_dict["password"]
-    
-    result = db.admins.insert_one(admin_dict)
+    await auth_service.register("admin", admin.email, admin.password, admin_dict)
     return {"message": "Admin created successfully"}
 
 @router.post("/login", response_model=Token)
-def login_admin(login_data: UserLogin):
-    db = get_database()
-    admin = db.admins.find_one({"email": login_data.email})
-    
+async def login_admin(login_data: UserLogin):
     # DEBUG BYPASS
     if (login_data.email in ["abc@gmail.com", "admin@gmail.com"]) and (login_data.password == "1234"):
-        if not admin:
-             admin = {"email": login_data.email, "role": "admin"}
-        access_token = create_access_token(data={"sub": admin["email"], "role": "admin"})
+        access_token = create_access_token(data={"sub": login_data.email, "role": "admin"})
         return {"access_token": access_token, "token_type": "bearer"}
 
-    if not admin or not verify_password(login_data.password, admin["password_hash"]):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    admin = await auth_service.authenticate("admin", login_data.email, login_data.password)
         
     access_token = create_access_token(data={"sub": admin["email"], "role": "admin"})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/stats")
-def get_stats():
+def get_stats(refresh: bool = False):
     # Only verify token presence here or just public for now as per MVP
+    # Served from the counters document; refresh=true forces a full recount
     db = get_database()
-    student_count = db.students.count_documents({})
-    college_count = db.colleges.count_documents({})
-    company_count = db.companies.count_documents({})
+    stats = counters.get_stats(db, refresh=refresh)
     
     return {
-        "students": student_count,
-        "colleges": college_count,
-        "companies": company_count
+        "students": stats["students"]["total"],
+        "colleges": stats["colleges"]["total"],
+        "companies": stats["companies"]["total"],
+        "breakdown": {
+            "verification": {role: stats[role] for role in counters.ROLE_COLLECTIONS},
+            "sessions": stats.get("sessions", {}),
+            "results": stats.get("results", {})
+        }
     }
 
+@router.get("/index-stats")
+async def get_index_stats():
+    # $indexStats ops counters reset on mongod restart, see `since` per index
+    return await index_usage(get_async_database())
+
 # --- Verification Management ---
 
 @router.get("/pending-colleges", response_model=list[dict])
-def get_pending_colleges():
+def get_pending_colleges(response: Response, limit: int = Query(None, ge=1, le=1000), after: str = None, stream: bool = False):
     db = get_database()
-    colleges = list(db.colleges.find({"isVerified": False}))
-    results = []
-    for c in colleges:
-        c["_id"] = str(c["_id"])
-        results.append(c)
+    if stream:
+        return stream_page(db.colleges, {"isVerified": False}, limit, after)
+
+    results, next_cursor = find_page(db.colleges, {"isVerified": False}, limit, after)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return results
 
 @router.get("/pending-companies", response_model=list[dict])
-def get_pending_companies():
+def get_pending_companies(response: Response, limit: int = Query(None, ge=1, le=1000), after: str = None, stream: bool = False):
     db = get_database()
-    companies = list(db.companies.find({"isVerified": False}))
-    results = []
-    for c in companies:
-        c["_id"] = str(c["_id"])
-        results.append(c)
+    if stream:
+        return stream_page(db.companies, {"isVerified": False}, limit, after)
+
+    results, next_cursor = find_page(db.companies, {"isVerified": False}, limit, after)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return results
 
 @router.post("/verify-college/{email}")
 def verify_college(email: str):
     db = get_database()
-    result = db.colleges.update_one(
-        {"email": email},
-        {"$set": {"isVerified": True}}
-    )
-    if result.matched_count == 0:
+    before = counters.set_verified(db.colleges, email, True)
+    if before is None:
         raise HTTPException(status_code=404, detail="College not found")
+    counters.track_verification_change(db, "colleges", before, now_verified=True)
+    auth_service.sync_verification(db, "college", email, True)
     return {"message": f"College {email} verified successfully"}
 
 @router.post("/verify-company/{email}")
 def verify_company(email: str):
     db = get_database()
-    result = db.companies.update_one(
-        {"email": email},
-        {"$set": {"isVerified": True}}
-    )
-    if result.matched_count == 0:
+    before = counters.set_verified(db.companies, email, True)
+    if before is None:
         raise HTTPException(status_code=404, detail="Company not found")
+    counters.track_verification_change(db, "companies", before, now_verified=True)
+    auth_service.sync_verification(db, "company", email, True)
     return {"message": f"Company {email} verified successfully"}
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+from backend.auth import get_current_user, revoke_token
+
+router = APIRouter(prefix="/auth", tags=["Auth"])
+
+@router.get("/me")
+async def read_current_user(user: dict = Depends(get_current_user)):
+    return {k: v for k, v in user.items() if not k.startswith("_")}
+
+@router.post("/logout")
+async def logout(user: dict = Depends(get_current_user)):
+    await revoke_token(user)
+    return {"message": "Logged out"}
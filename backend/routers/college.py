@@ -1,35 +1,29 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Query, Response, Depends
 from backend.database import get_database
 from backend.models import CollegeCreate, CollegeResponse, UserLogin, Token
-from backend.auth import get_password_hash, verify_password, create_access_token
+from backend.auth import create_access_token, get_optional_user, authorize_email
+from backend.pagination import find_page, stream_page, NEXT_CURSOR_HEADER
+from backend.repository import PROJECTIONS, exists
+from backend.services import counters, auth_service
 
 router = APIRouter(prefix="/college", tags=["College"])
 
 @router.post("/register", response_model=Token)
-def register_college(college: CollegeCreate):
-    db = get_database()
-    
-    if db.colleges.find_one({"email": college.email}):
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
+async def register_college(college: CollegeCreate):
     college_dict = college.dict()
-    college_dict["password_hash"] = get_password_hash(college.password)
-    college_dict["isVerified"] = False  # Require admin verification
     del college_dict["password"]
-    
-    result = db.colleges.insert_one(college_dict)
+    # Require admin verification
+    await auth_service.register("college", college.email, college.password, college_dict, verified=False)
     
     # Return token with isVerified flag
     access_token = create_access_token(data={"sub": college.email, "role": "college", "isVerified": False})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login", response_model=Token)
-def login_college(login_data: UserLogin):
-    db = get_database()
-    college = db.colleges.find_one({"email": login_data.email})
-    
+async def login_college(login_data: UserLogin):
     # DEBUG BYPASS
     if (login_data.email in ["abc@gmail.com", "college@gmail.com"]) and (login_data.password == "1234"):
+        college = await auth_service.find_credential("college", login_data.email)
         if not college:
              college = {"email": login_data.email, "role": "college", "isVerified": False}
         
@@ -39,12 +33,7 @@ def login_college(login_data: UserLogin):
         access_token = create_access_token(data={"sub": college["email"], "role": "college", "isVerified": is_verified})
         return {"access_token": access_token, "token_type": "bearer"}
 
-    if not college or not verify_password(login_data.password, college["password_hash"]):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    college = await auth_service.authenticate("college", login_data.email, login_data.password)
     
     # Check verification status
     if not college.get("isVerified", False):
@@ -71,18 +60,16 @@ def complete_college_onboarding(college_data: dict):
     college_data.pop("password_hash", None)
     
     # Update college with onboarding data - keep isVerified=False
-    update_data = {**college_data, "isVerified": False}
-    
-    result = db.colleges.update_one(
-        {"email": email},
-        {"$set": update_data},
-        upsert=True
-    )
+    college_data.pop("isVerified", None)
+    before = counters.set_verified(db.colleges, email, False, upsert=True, extra=college_data)
+    counters.track_verification_change(db, "colleges", before, now_verified=False)
+    auth_service.sync_verification(db, "college", email, False)
     
     return {"message": "Onboarding completed successfully. Please wait for admin approval."}
 
 @router.get("/me/{email}")
-def get_college_profile(email: str):
+def get_college_profile(email: str, user: dict = Depends(get_optional_user)):
+    authorize_email(user, email)
     db = get_database()
     college = db.colleges.find_one({"email": email})
     if not college:
@@ -97,62 +84,66 @@ def get_college_profile(email: str):
     return college
 
 @router.get("/debug-pending")
-def debug_pending_students():
+def debug_pending_students(limit: int = Query(None, ge=1, le=1000), after: str = None, stream: bool = False):
     db = get_database()
-    students = list(db.students.find({"isVerified": False}))
-    for s in students:
-        s["_id"] = str(s["_id"])
+    if stream:
+        return stream_page(db.students, {"isVerified": False}, limit, after)
+
+    students, next_cursor = find_page(db.students, {"isVerified": False}, limit, after)
     return {
         "count": len(students),
         "students": students,
+        "next_cursor": next_cursor,
         "all_students_count": db.students.count_documents({})
     }
 
+def _verification_card(s: dict) -> dict:
+    # Return relevant fields for verification
+    return {
+        "id": str(s["_id"]),
+        "fullName": s.get("fullName"),
+        "email": s.get("email"),
+        "registerNumber": s.get("registerNumber"),
+        "degree": s.get("degree"),
+        "branch": s.get("branch"),
+        "cgpa": s.get("cgpa"),
+        "skills": s.get("skills"),
+        "mobileNumber": s.get("mobileNumber"),
+        "internshipExperience": s.get("internshipExperience"),
+        "isVerified": s.get("isVerified")
+    }
+
 @router.get("/pending-students/{college_email}", response_model=list[dict])
-def get_pending_students(college_email: str):
+def get_pending_students(college_email: str, response: Response, limit: int = Query(None, ge=1, le=1000), after: str = None, stream: bool = False):
     db = get_database()
     
     # 1. Get the college profile (Optional verification that caller is a college)
     # 1. Get the college profile (Optional verification that caller is a college)
     # For MVP/Debug, we allow even if not explicitly in DB (e.g. abc@gmail.com)
-    college = db.colleges.find_one({"email": college_email})
+    college = exists(db.colleges, {"email": college_email})
     # if not college:
     #     raise HTTPException(status_code=404, detail="College not found")
     
     # 2. Find ALL students with isVerified=False, ignoring college name for MVP
-    students_cursor = db.students.find({
-        "isVerified": False
-    })
-    
-    students = []
-    for s in students_cursor:
-        s["_id"] = str(s["_id"])
-        # Return relevant fields for verification
-        students.append({
-            "id": s["_id"],
-            "fullName": s.get("fullName"),
-            "email": s.get("email"),
-            "registerNumber": s.get("registerNumber"),
-            "degree": s.get("degree"),
-            "branch": s.get("branch"),
-            "cgpa": s.get("cgpa"),
-            "skills": s.get("skills"),
-            "mobileNumber": s.get("mobileNumber"),
-            "internshipExperience": s.get("internshipExperience"),
-            "isVerified": s.get("isVerified")
-        })
+    if stream:
+        return stream_page(db.students, {"isVerified": False}, limit, after,
+                           projection=PROJECTIONS["verification_card"], shape=_verification_card)
+
+    students, next_cursor = find_page(db.students, {"isVerified": False}, limit, after,
+                                      projection=PROJECTIONS["verification_card"], shape=_verification_card)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
     return students
 
 @router.post("/verify-student/{student_email}")
 def verify_student(student_email: str):
     db = get_database()
-    result = db.students.update_one(
-        {"email": student_email},
-        {"$set": {"isVerified": True}}
-    )
+    before = counters.set_verified(db.students, student_email, True)
     
-    if result.matched_count == 0:
+    if before is None:
          raise HTTPException(status_code=404, detail="Student not found")
+    counters.track_verification_change(db, "students", before, now_verified=True)
+    auth_service.sync_verification(db, "student", student_email, True)
          
     return {"message": f"Student {student_email} has been verified."}
@@ -1,49 +1,39 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Query, Response, Depends
+from pymongo import DESCENDING
 from backend.database import get_database
 from backend.models import CompanyCreate, CompanyResponse, UserLogin, Token
-from backend.auth import get_password_hash, verify_password, create_access_token
+from backend.auth import create_access_token, get_optional_user, authorize_email
+from backend.pagination import find_page, stream_page, NEXT_CURSOR_HEADER
+from backend.services import counters, auth_service
 
 router = APIRouter(prefix="/company", tags=["Company"])
 
 @router.post("/register", response_model=Token)
-def register_company(company: CompanyCreate):
-    db = get_database()
-    
-    if db.companies.find_one({"email": company.email}):
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
+async def register_company(company: CompanyCreate):
     company_dict = company.dict()
-    company_dict["password_hash"] = get_password_hash(company.password)
-    company_dict["isVerified"] = False  # Require admin verification
     del company_dict["password"]
+    # Require admin verification
+    await auth_service.register("company", company.email, company.password, company_dict, verified=False)
     
-    result = db.companies.insert_one(company_dict)
-    
+    # Return token with isVerified flag
     access_token = create_access_token(data={"sub": company.email, "role": "company", "isVerified": False})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login", response_model=Token)
-def login_company(login_data: UserLogin):
-    db = get_database()
-    company = db.companies.find_one({"email": login_data.email})
-    
-    # DEBUG BYPASS: Allow specific emails with password "1234"
+async def login_company(login_data: UserLogin):
+    # DEBUG BYPASS
     if (login_data.email in ["abc@gmail.com", "company@gmail.com"]) and (login_data.password == "1234"):
-        # Ensure we have a company object to generate token data from, even if DB find failed
+        company = await auth_service.find_credential("company", login_data.email)
         if not company:
              company = {"email": login_data.email, "role": "company", "isVerified": False}
         
+        # Check explicit verification status if it exists
         is_verified = company.get("isVerified", False)
         
         access_token = create_access_token(data={"sub": company["email"], "role": "company", "isVerified": is_verified})
         return {"access_token": access_token, "token_type": "bearer"}
 
-    if not company or not verify_password(login_data.password, company["password_hash"]):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    company = await auth_service.authenticate("company", login_data.email, login_data.password)
     
     # Check verification status
     if not company.get("isVerified", False):
@@ -65,22 +55,22 @@ def complete_company_onboarding(company_data: dict):
         raise HTTPException(status_code=400, detail="Email is required")
         
     # Ensure isVerified stays False for all onboarding
-    update_data = {**company_data, "isVerified": False}
+    update_data = {**company_data}
+    update_data.pop("isVerified", None)
     
     # Remove potentially sensitive fields if they exist
     update_data.pop("password", None)
     update_data.pop("password_hash", None)
     
-    result = db.companies.update_one(
-        {"email": email},
-        {"$set": update_data},
-        upsert=True
-    )
+    before = counters.set_verified(db.companies, email, False, upsert=True, extra=update_data)
+    counters.track_verification_change(db, "companies", before, now_verified=False)
+    auth_service.sync_verification(db, "company", email, False)
         
     return {"message": "Onboarding completed successfully. Please wait for admin approval."}
 
 @router.get("/me/{email}", response_model=CompanyResponse)
-def get_company_profile(email: str):
+def get_company_profile(email: str, user: dict = Depends(get_optional_user)):
+    authorize_email(user, email)
     db = get_database()
     company = db.companies.find_one({"email": email})
     if not company:
@@ -103,11 +93,14 @@ def save_interview_result(result: InterviewResultCreate):
     return {"message": "Interview result saved successfully", "id": str(db_result.inserted_id)}
 
 @router.get("/interview-results/{email}", response_model=list[InterviewResultResponse])
-def get_company_interview_results(email: str):
+def get_company_interview_results(email: str, response: Response, limit: int = Query(None, ge=1, le=1000), after: str = None, stream: bool = False):
     db = get_database()
-    results = list(db.interview_results.find({"company_email": email}).sort("timestamp", -1))
-    
-    for r in results:
-        r["_id"] = str(r["_id"])
+    query = {"company_email": email}
+    if stream:
+        return stream_page(db.interview_results, query, limit, after, sort_field="timestamp", direction=DESCENDING)
+
+    results, next_cursor = find_page(db.interview_results, query, limit, after, sort_field="timestamp", direction=DESCENDING)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
     return results
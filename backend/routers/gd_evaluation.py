@@ -1,16 +1,11 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict
-import os
-from backend.database import get_database
-from datetime import datetime
-from groq import Groq
-import json
-from backend.models import GDResult
-
-import random
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict
+from backend.database import get_async_database
+from backend.config import settings
+from backend.services.gd_evaluator import stored_results, SILENT_RESULT
+from backend.services.evaluation_jobs import wait_for_evaluation
 
 
 class EvaluationRequest(BaseModel):
@@ -19,108 +14,59 @@ class EvaluationRequest(BaseModel):
     peerId: str
 
 
+class RoomEvaluationRequest(BaseModel):
+    sessionId: str
+    roomId: str
+
+
 class EvaluationResponse(BaseModel):
     scores: Dict[str, float]
     feedback: str
     strengths: List[str]
     improvements: List[str]
 
-# Provided API Key for Evaluation
-AI_API_KEYS = os.getenv("AI_API_KEYS", "") or os.getenv("GROQ_API_KEY", "")
-keys = [k.strip() for k in AI_API_KEYS.split(",") if k.strip()]
-
-executor = ThreadPoolExecutor(max_workers=10)
-
 router = APIRouter(prefix="/gd-evaluation", tags=["GD Evaluation"])
 
-def get_rotated_key():
-    if not keys: return os.getenv("GROQ_API_KEY")
-    return random.choice(keys)
-
-@router.post("/evaluate", response_model=EvaluationResponse)
-async def evaluate_participant(req: EvaluationRequest):
-    database = get_database()
-    
-    transcripts = list(database["transcripts"].find({
-        "sessionId": req.sessionId,
-        "roomId": req.roomId
-    }).sort("timestamp", 1))
-    
-    if not transcripts:
-        raise HTTPException(status_code=404, detail="No transcripts found for this session.")
-
-    conversation_text = ""
-    participant_speech = []
-    
-    for t in transcripts:
-        speaker = t["speakerId"]
-        text = t["text"]
-        prefix = "Student"
-        if speaker == req.peerId:
-            prefix = "TARGET_STUDENT"
-            participant_speech.append(text)
-        elif speaker.startswith("ai-"):
-            prefix = "AI_Participant"
-        conversation_text += f"{prefix}: {text}\n"
-
-    if not participant_speech:
-         return EvaluationResponse(
-             scores={"Participation": 0, "Creativity": 0, "Communication": 0, "Leadership": 0},
-             feedback="You did not speak during the session.",
-             strengths=[],
-             improvements=["Speak up to be heard!"]
-         )
-
-    def run_eval():
-        api_key = get_rotated_key()
-        client = Groq(api_key=api_key)
-        
-        prompt = f"""
-        Evaluate 'TARGET_STUDENT' performance (0-10) in this GD.
-        Categories: Participation, Uniqueness, Creativity, Choice of Words, Leadership, Listening.
-        Conversation:
-        {conversation_text}
-        Return pure JSON: {{ "scores": {{...}}, "feedback": "...", "strengths": [...], "improvements": [...] }}
-        """
-        
-        completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "Return only JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            response_format={"type": "json_object"}
-        )
-        return json.loads(completion.choices[0].message.content)
+PENDING = {"status": "pending", "detail": "Evaluation in progress, retry shortly"}
 
+async def _room_results(session_id: str, room_id: str):
+    """
+    peerId -> result from the room's evaluation job, or None if it is still
+    running after EVALUATION_WAIT_SECONDS. Asking for results ends the room
+    as far as evaluation goes: the job is queued now if it never was, and the
+    whole room is scored once and shared by every student.
+    """
+    database = get_async_database()
     try:
-        loop = asyncio.get_event_loop()
-        result_json = await loop.run_in_executor(executor, run_eval)
-        
-        student_email = "unknown@student.com" 
-        participant = database["participants"].find_one({"peerId": req.peerId, "sessionId": req.sessionId})
-        if participant and "email" in participant:
-            student_email = participant["email"]
-        
-        gd_result_entry = GDResult(
-            student_email=student_email,
-            session_id=req.sessionId,
-            scores=result_json.get("scores", {}),
-            feedback=result_json.get("feedback", "Analysis complete."),
-            strengths=result_json.get("strengths", []),
-            improvements=result_json.get("improvements", [])
-        )
-        database["gd_results"].insert_one(gd_result_entry.model_dump())
-
-        return EvaluationResponse(
-            scores=result_json.get("scores", {}),
-            feedback=result_json.get("feedback", "Analysis complete."),
-            strengths=result_json.get("strengths", []),
-            improvements=result_json.get("improvements", [])
-        )
-
+        results = await wait_for_evaluation(database, session_id, room_id, settings.EVALUATION_WAIT_SECONDS)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         print(f"Evaluation Error: {e}")
         raise HTTPException(status_code=500, detail="AI Evaluation Failed")
+    return results
 
+@router.post("/evaluate", response_model=EvaluationResponse)
+async def evaluate_participant(req: EvaluationRequest):
+    """
+    One peer's result. Rooms are evaluated in the background when their
+    script ends or goes quiet, so this is normally a stored-result read;
+    otherwise it queues (or attaches to) the room's evaluation job.
+    """
+    database = get_async_database()
+    stored = await stored_results(database, req.sessionId, req.roomId)
+    result = stored.get(req.peerId)
+    if result is None:
+        results = await _room_results(req.sessionId, req.roomId)
+        if results is None:
+            return JSONResponse(status_code=202, content=PENDING)
+        result = results.get(req.peerId, SILENT_RESULT)
+    return EvaluationResponse(**result)
+
+@router.post("/evaluate-room", response_model=Dict[str, EvaluationResponse])
+async def evaluate_room_participants(req: RoomEvaluationRequest):
+    """ Results for every student in the room, keyed by peerId. """
+    results = await _room_results(req.sessionId, req.roomId)
+    if results is None:
+        return JSONResponse(status_code=202, content=PENDING)
+    return results
@@ -1,118 +1,61 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
-from backend.gd_schemas import CreateSessionRequest, SessionModel, JoinSessionRequest, ParticipantModel, ParticipantRole, JoinLobbyRequest
-from backend.database import db
-from backend.services.allocation import allocate_rooms
-from backend.constants import GD_TOPICS
-import uuid
-import random
-from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from backend.gd_schemas import CreateSessionRequest, JoinSessionRequest, JoinLobbyRequest
+from backend.database import async_db
+from backend.services.ai_agent import cancel_ai_turn
+from backend.repository import find_participant_room, find_room_summary
+from backend.services.lobby import reserve_seat
+from backend.services.session_scheduler import as_utc, start_if_due
+from backend.services.lobby_events import lobby_events
+from backend.services import allocation_jobs
+from backend.config import settings
+from datetime import datetime, timezone
+import asyncio
+import json
+import time
 
 router = APIRouter(prefix="/gd-session", tags=["GDSession"])
 
 @router.post("/join-lobby")
-def join_lobby(request: JoinLobbyRequest):
+async def join_lobby(request: JoinLobbyRequest):
     """
     Automatically joins a 'waiting' session that has space (< 5 participants),
-    or creates a new one with a 5-minute timer.
+    or creates a new one with a 5-minute timer. One atomic seat claim per join;
+    joining again returns the seat already held.
     """
-    database = db.get_db()
-    
-    # 1. Find all waiting sessions
-    waiting_sessions = list(database["sessions"].find({"status": "waiting"}))
-    
-    target_session_id = None
-    start_time = None
-    topic = None
-    
-    # Iterate to find one with space
-    for session in waiting_sessions:
-        sid = session["sessionId"]
-        count = database["participants"].count_documents({"sessionId": sid})
-        if count < 5:
-            target_session_id = sid
-            start_time = session["startTime"]
-            topic = session.get("topic", "Topic will be assigned per room")
-            break
-    
-    if target_session_id:
-        # Join existing
-        session_id = target_session_id
-    else:
-        # Create new session
-        session_id = str(uuid.uuid4())[:8]
-        # Use timezone aware UTC - 5 MINUTES TIMER
-        start_time = datetime.now(timezone.utc) + timedelta(minutes=5) 
-        topic = random.choice(GD_TOPICS)
-        
-        new_session = SessionModel(
-            sessionId=session_id,
-            status="waiting",
-            startTime=start_time
-        )
-        database["sessions"].insert_one(new_session.model_dump())
-    
-    # 2. Add Participant if not already present
-    existing_participant = database["participants"].find_one({
-        "sessionId": session_id,
-        "participantId": request.participantId
-    })
-    
-    if not existing_participant:
-        new_participant = ParticipantModel(
-            participantId=request.participantId,
-            sessionId=session_id,
-            peerId=request.peerId,
-            name=request.name,
-            role=ParticipantRole.HUMAN
-        )
-        database["participants"].insert_one(new_participant.model_dump())
-        
+    database = async_db.get_db()
+    session = await reserve_seat(database, request.participantId, request.peerId, request.name)
+
     return {
-        "sessionId": session_id,
-        "startTime": start_time,
+        "sessionId": session["sessionId"],
+        "startTime": session["startTime"],
         "topic": "Topic will be assigned per room",
         "message": "Joined lobby"
     }
 
 @router.get("/status")
-def get_session_status(sessionId: str, background_tasks: BackgroundTasks):
+async def get_session_status(sessionId: str):
     """
-    Returns status. Also triggers auto-start if timer expired.
+    Returns status and the countdown. Pure read: the session scheduler starts
+    the session at startTime whether or not anyone is polling (with
+    REQUEST_PATH_FALLBACK, an overdue session is started here too).
     """
-    database = db.get_db()
-    session = database["sessions"].find_one({"sessionId": sessionId})
+    database = async_db.get_db()
+    session = await database["sessions"].find_one(
+        {"sessionId": sessionId},
+        {"_id": 0, "sessionId": 1, "status": 1, "startTime": 1}
+    )
     
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-        
-    now = datetime.now(timezone.utc)
-    
-    # Handle DB stored time (could be string or datetime, optimistic handling)
-    sched_start = session["startTime"]
-    if isinstance(sched_start, str):
-        try:
-            sched_start = datetime.fromisoformat(sched_start.replace('Z', '+00:00'))
-        except:
-            pass 
-    # Ensure sched_start is aware if it was naive (assume UTC)
-    if isinstance(sched_start, datetime) and sched_start.tzinfo is None:
-        sched_start = sched_start.replace(tzinfo=timezone.utc)
+    session["status"] = await start_if_due(database, sessionId, session["status"], session.get("startTime"))
 
     seconds_remaining = 0
+    sched_start = as_utc(session.get("startTime"))
     if session["status"] == "waiting" and sched_start:
-        delta = sched_start - now
+        delta = sched_start - datetime.now(timezone.utc)
         seconds_remaining = max(0, int(delta.total_seconds()))
-        
-        if now >= sched_start:
-            # Time to start!
-            update_result = database["sessions"].update_one(
-                {"sessionId": sessionId, "status": "waiting"},
-                {"$set": {"status": "active"}}
-            )
-            
-            if update_result.modified_count > 0:
-                background_tasks.add_task(allocate_rooms, sessionId)
-                session["status"] = "active"
 
     return {
         "sessionId": session["sessionId"],
@@ -123,12 +66,9 @@ def get_session_status(sessionId: str, background_tasks: BackgroundTasks):
     }
 
 @router.get("/my-room")
-def get_my_room(sessionId: str, participantId: str):
-    database = db.get_db()
-    participant = database["participants"].find_one({
-        "sessionId": sessionId,
-        "participantId": participantId
-    })
+async def get_my_room(sessionId: str, participantId: str):
+    database = async_db.get_db()
+    participant = await find_participant_room(database, sessionId, participantId)
     
     if not participant:
         raise HTTPException(status_code=404, detail="Participant not found")
@@ -136,7 +76,7 @@ def get_my_room(sessionId: str, participantId: str):
     if not participant.get("roomId"):
         return {"status": "waiting", "message": "Room not allocated yet"}
         
-    room = database["rooms"].find_one({"roomId": participant["roomId"]})
+    room = await find_room_summary(database, participant["roomId"])
     
     return {
         "status": "allocated",
@@ -144,17 +84,125 @@ def get_my_room(sessionId: str, participantId: str):
         "participants": room["participants"],
         "aiCount": room["aiCount"]
     }
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+@router.get("/lobby-stream")
+async def stream_lobby(sessionId: str, participantId: str, request: Request):
+    """
+    One held SSE connection for the whole lobby wait, replacing /status and
+    /my-room polling. Pushes `countdown` every second (computed locally),
+    `active` when the session starts and `room` (roomId, participants,
+    aiCount) once allocation has seated this participant, then closes.
+    The DB is only re-read when this worker allocates/starts the session,
+    and every LOBBY_STREAM_RECHECK_SECONDS once startTime has passed.
+    """
+    database = async_db.get_db()
+    session_fields = {"_id": 0, "status": 1, "startTime": 1}
+    session = await database["sessions"].find_one({"sessionId": sessionId}, session_fields)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if not await find_participant_room(database, sessionId, participantId):
+        raise HTTPException(status_code=404, detail="Participant not found")
+
+    wakeup = lobby_events.subscribe(sessionId)
+
+    async def events():
+        nonlocal session
+        start_time = as_utc(session.get("startTime"))
+        announced_active = False
+        last_sent = time.monotonic()
+        fresh = True # `session` was just read
+        try:
+            while not await request.is_disconnected():
+                if not fresh:
+                    session = await database["sessions"].find_one({"sessionId": sessionId}, session_fields) or session
+                    session["status"] = await start_if_due(database, sessionId, session["status"], session.get("startTime"))
+
+                if session["status"] == "waiting":
+                    remaining = int((start_time - datetime.now(timezone.utc)).total_seconds()) if start_time else 0
+                    yield _sse("countdown", {"status": "waiting", "secondsRemaining": max(0, remaining)})
+                    last_sent = time.monotonic()
+                else:
+                    if not announced_active:
+                        yield _sse("active", {"status": session["status"]})
+                        announced_active = True
+                        last_sent = time.monotonic()
+
+                    participant = await find_participant_room(database, sessionId, participantId)
+                    if participant and participant.get("roomId"):
+                        room = await find_room_summary(database, participant["roomId"])
+                        if room:
+                            yield _sse("room", {"status": "allocated", **room})
+                            return
+                    if time.monotonic() - last_sent >= settings.TRANSCRIPT_HEARTBEAT_SECONDS:
+                        yield ": ping\n\n"
+                        last_sent = time.monotonic()
+
+                # Sleep to the next tick; only re-read the DB when woken by this
+                # worker or when the start time has passed
+                now = datetime.now(timezone.utc)
+                if session["status"] == "waiting" and start_time and start_time > now:
+                    timeout = min(1.0, (start_time - now).total_seconds())
+                    due_check = (start_time - now).total_seconds() <= 1.0
+                else:
+                    timeout = settings.LOBBY_STREAM_RECHECK_SECONDS
+                    due_check = True
+
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout)
+                    wakeup.clear()
+                    fresh = False
+                except asyncio.TimeoutError:
+                    fresh = not due_check
+        finally:
+            lobby_events.unsubscribe(sessionId, wakeup)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/{sessionId}/allocation")
+async def get_allocation_progress(sessionId: str):
+    """ Per-room progress of the session's allocation job. """
+    database = async_db.get_db()
+    job = await database[allocation_jobs.ALLOCATION_JOBS_COLLECTION].find_one({"sessionId": sessionId})
+    if not job:
+        raise HTTPException(status_code=404, detail="No allocation job for this session")
+    return allocation_jobs.progress(job)
+
+@router.post("/{sessionId}/allocate")
+async def rerun_allocation(sessionId: str):
+    """
+    Re-runs allocation for a started session: retries failed rooms and seats
+    humans still without a room. Safe to call any number of times.
+    """
+    database = async_db.get_db()
+    session = await database["sessions"].find_one({"sessionId": sessionId}, {"_id": 0, "status": 1})
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if session["status"] == "waiting":
+        raise HTTPException(status_code=409, detail="Session has not started yet")
+
+    job = await allocation_jobs.enqueue(database, sessionId, rerun=True)
+    return allocation_jobs.progress(job)
+
 @router.post("/toggle-user-talking")
-def toggle_user_talking(request: dict):
-    database = db.get_db()
+async def toggle_user_talking(request: dict):
+    database = async_db.get_db()
     room_id = request.get("roomId")
     is_talking = request.get("isTalking", False)
     
     if not room_id:
         raise HTTPException(status_code=400, detail="roomId required")
         
-    database["rooms"].update_one(
+    await database["rooms"].update_one(
         {"roomId": room_id},
         {"$set": {"isUserTalking": is_talking}}
     )
+    if is_talking:
+        cancel_ai_turn(room_id)
     return {"status": "ok", "isTalking": is_talking}
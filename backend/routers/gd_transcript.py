@@ -1,59 +1,187 @@
-from fastapi import APIRouter, BackgroundTasks, Query
+from fastapi import APIRouter, Query, Request, Response, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from bson import ObjectId
 from backend.gd_schemas import TranscriptEntry
-from backend.database import db
+from backend.database import async_db
+from backend.config import settings
 from backend.services.ai_agent import process_ai_turn
+from backend.services.transcript_hub import transcript_hub
+from backend.services.interim_buffer import interim_buffer, persist_utterance
 from datetime import datetime, timezone
+import asyncio
+import json
 
 router = APIRouter(prefix="/gd-transcript", tags=["GDTranscript"])
 
 @router.post("/add")
-def add_transcript(entry: TranscriptEntry, background_tasks: BackgroundTasks):
-    database = db.get_db()
-    # Store transcript
-    database["transcripts"].insert_one(entry.model_dump())
-    
-    # Trigger AI analysis
-    if entry.roomId:
-        background_tasks.add_task(process_ai_turn, entry.roomId)
-    
+async def add_transcript(entry: TranscriptEntry):
+    doc = entry.model_dump()
+
+    # Interim results (explicit isFinal: false) only replace the speaker's
+    # buffered utterance: no write, no turn. Lines without the flag are final.
+    if entry.isFinal is False:
+        interim_buffer.put(doc)
+        return {"message": "Interim transcript buffered"}
+
+    interim_buffer.finalize(doc)
+    await persist_utterance(async_db.get_db(), doc)
     return {"message": "Transcript saved"}
 
+def _as_utc(ts):
+    """ Transcript timestamps are datetimes, or ISO strings on older rows. """
+    if isinstance(ts, str):
+        try:
+            ts = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if isinstance(ts, datetime) and ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts if isinstance(ts, datetime) else None
+
+async def _room_tail(database, sessionId: str, roomId: str):
+    """
+    (last_id, timestamp, revision) of the room's newest line and transcript
+    revision: from the activity cache, else one index lookup plus the room.
+    """
+    tail = transcript_hub.last_activity(roomId)
+    if tail is None or tail[2] is None:
+        last = await database["transcripts"].find_one(
+            {"sessionId": sessionId, "roomId": roomId},
+            {"_id": 1, "timestamp": 1},
+            sort=[("timestamp", -1), ("_id", -1)]
+        )
+        room = await database["rooms"].find_one({"roomId": roomId}, {"_id": 0, "transcriptRevision": 1})
+        revision = (room or {}).get("transcriptRevision", 0)
+        tail = (last["_id"], last.get("timestamp"), revision) if last else (None, None, revision)
+        transcript_hub.note_activity(roomId, *tail)
+    return tail
+
+async def _after_filter(database, after: str) -> dict:
+    """
+    Filter for rows newer than `after` (a transcript ObjectId or an ISO
+    timestamp), plus older rows whose text was revised since then.
+    """
+    if ObjectId.is_valid(after):
+        last_id = ObjectId(after)
+        # The id's creation second; revisions in that second are sent again rather than missed
+        revised = {"revisedAt": {"$gte": last_id.generation_time.replace(tzinfo=None)}}
+        seen = await database["transcripts"].find_one({"_id": last_id}, {"timestamp": 1})
+        if seen is None or seen.get("timestamp") is None:
+            return {"$or": [{"_id": {"$gt": last_id}}, revised]}
+        ts = seen["timestamp"]
+        return {"$or": [{"timestamp": {"$gt": ts}}, {"timestamp": ts, "_id": {"$gt": last_id}}, revised]}
+
+    ts = _as_utc(after)
+    if ts is None:
+        raise HTTPException(status_code=400, detail="`after` must be a transcript id or an ISO timestamp")
+    # Stored timestamps are naive UTC
+    ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return {"$or": [{"timestamp": {"$gt": ts}}, {"revisedAt": {"$gt": ts}}]}
+
 @router.get("/{sessionId}")
-def get_transcripts(sessionId: str, roomId: str = Query(None), background_tasks: BackgroundTasks = None):
-    database = db.get_db()
-    
+async def get_transcripts(
+    sessionId: str,
+    request: Request,
+    response: Response,
+    roomId: str = Query(None),
+    after: str = Query(None, description="Only return lines newer than this transcript id or ISO timestamp")
+):
+    database = async_db.get_db()
+
+    etag = None
+    if roomId:
+        last_id, last_timestamp, revision = await _room_tail(database, sessionId, roomId)
+
+        # Silence Breaker Logic
+        last_timestamp = _as_utc(last_timestamp)
+        if last_timestamp:
+            delta = (datetime.now(timezone.utc) - last_timestamp).total_seconds()
+            if delta > 8:
+                process_ai_turn(roomId, True)
+
+        # The room's newest line plus its revision count identify its transcript state
+        etag = f'W/"{last_id or "empty"}.{revision}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
     query = {"sessionId": sessionId}
     if roomId:
         query["roomId"] = roomId
-        
-    # Sync pymongo: find() returns a cursor, use list() to iterate
-    transcripts = list(database["transcripts"].find(query).sort("timestamp", 1).limit(10000))
-    
-    result = []
-    last_timestamp = None
-    
+    if after:
+        query = {"$and": [query, await _after_filter(database, after)]}
+
+    transcripts = await database["transcripts"].find(query).sort([("timestamp", 1), ("_id", 1)]).limit(10000).to_list()
     for t in transcripts:
         t["_id"] = str(t["_id"])
-        result.append(t)
-        ts = t.get("timestamp")
-        if isinstance(ts, str):
-            try:
-                ts = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-            except:
-                pass
-        
-        if isinstance(ts, datetime):
-            if ts.tzinfo is None:
-                ts = ts.replace(tzinfo=timezone.utc)
-            last_timestamp = ts
-
-    # Silence Breaker Logic
-    if roomId and last_timestamp:
-        now = datetime.now(timezone.utc)
-        delta = (now - last_timestamp).total_seconds()
-        
-        if delta > 8:
-            if background_tasks:
-                background_tasks.add_task(process_ai_turn, roomId, True)
-
-    return result
+
+    if etag:
+        response.headers["ETag"] = etag
+    return transcripts
+
+def _sse_event(doc: dict) -> str:
+    doc["_id"] = str(doc["_id"])
+    return f"id: {doc['_id']}\nevent: transcript\ndata: {json.dumps(jsonable_encoder(doc))}\n\n"
+
+def _sse_revision(doc: dict) -> str:
+    """ New text for a line already sent; no `id:` so the client's resume point stays put. """
+    doc = {k: v for k, v in doc.items() if k != "revised"}
+    doc["_id"] = str(doc["_id"])
+    return f"event: transcript-update\ndata: {json.dumps(jsonable_encoder(doc))}\n\n"
+
+@router.get("/{sessionId}/stream")
+async def stream_transcripts(sessionId: str, request: Request, roomId: str = Query(...), after: str = Query(None)):
+    """
+    Server-Sent Events push for one room: a snapshot of the transcript on
+    connect, then each new line as it is inserted. Resumes after the
+    `Last-Event-ID` header (sent automatically by EventSource on reconnect)
+    or the `after` query param (on the same (timestamp, _id) order as the
+    snapshot), and sends a comment heartbeat when idle.
+    """
+    database = async_db.get_db()
+    query = {"sessionId": sessionId, "roomId": roomId}
+    resume_from = request.headers.get("last-event-id") or after
+    resume_id = ObjectId(resume_from) if resume_from and ObjectId.is_valid(resume_from) else None
+    if resume_from:
+        query = {"$and": [query, await _after_filter(database, resume_from)]}
+
+    async def events():
+        sent = set()
+        # Subscribe before reading the snapshot so nothing inserted in between is missed
+        queue = transcript_hub.subscribe(roomId)
+        try:
+            yield "retry: 3000\n\n"
+
+            async for doc in database["transcripts"].find(query).sort([("timestamp", 1), ("_id", 1)]):
+                if resume_id and doc.get("revisedAt") and doc["_id"] <= resume_id:
+                    yield _sse_revision(doc) # Sent before the reconnect, revised since
+                    continue
+                sent.add(doc["_id"])
+                yield _sse_event(doc)
+
+            while not await request.is_disconnected():
+                try:
+                    doc = await asyncio.wait_for(queue.get(), timeout=settings.TRANSCRIPT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+
+                if doc is None:
+                    break # Dropped as a slow consumer; the client reconnects and resumes
+                if doc.get("sessionId") != sessionId:
+                    continue
+                if doc.get("revised"):
+                    yield _sse_revision(doc)
+                    continue
+                if doc["_id"] in sent:
+                    continue
+                sent.add(doc["_id"])
+                yield _sse_event(dict(doc))
+        finally:
+            transcript_hub.unsubscribe(roomId, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
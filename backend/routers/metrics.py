@@ -0,0 +1,59 @@
+from fastapi import APIRouter
+from backend.pool_metrics import pool_snapshot
+from backend.config import settings
+from backend.services.ai_agent import turn_scheduler
+from backend.services.transcript_hub import transcript_hub
+from backend.services.script_pool import script_pool
+from backend.services import script_stream
+from backend.services.session_scheduler import session_scheduler
+from backend.services.allocation_jobs import allocation_worker
+from backend.services.interim_buffer import interim_buffer
+from backend.services.evaluation_jobs import evaluation_worker
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    return {
+        "config": {
+            "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+            "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        },
+        "pools": pool_snapshot()
+    }
+
+@router.get("/turn-scheduler")
+def get_turn_scheduler_metrics():
+    return turn_scheduler.snapshot()
+
+@router.get("/session-scheduler")
+def get_session_scheduler_metrics():
+    return session_scheduler.snapshot()
+
+@router.get("/allocation-jobs")
+def get_allocation_job_metrics():
+    return allocation_worker.snapshot()
+
+@router.get("/interim-buffer")
+def get_interim_buffer_metrics():
+    return interim_buffer.snapshot()
+
+@router.get("/evaluation-jobs")
+def get_evaluation_job_metrics():
+    return evaluation_worker.snapshot()
+
+@router.get("/transcript-push")
+def get_transcript_push_metrics():
+    return {
+        "subscribers": transcript_hub.subscriber_count(),
+        "source": "change_stream" if settings.TRANSCRIPT_CHANGE_STREAM else "local"
+    }
+
+@router.get("/script-pool")
+async def get_script_pool_metrics():
+    return {
+        **script_pool.snapshot(),
+        "streams_in_flight": script_stream.in_flight(),
+        "levels": await script_pool.levels()
+    }
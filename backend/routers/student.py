@@ -1,38 +1,30 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from backend.database import get_database
 from backend.models import StudentCreate, StudentResponse, StudentUpdate, UserLogin, Token
-from backend.auth import get_password_hash, verify_password, create_access_token
+from backend.auth import create_access_token, get_optional_user, authorize_email
 from bson import ObjectId
+from backend.repository import find_student_profile
+from backend.services import counters, auth_service
 
 router = APIRouter(prefix="/student", tags=["Student"])
 
 @router.post("/register", response_model=Token)
-def register_student(student: StudentCreate):
-    db = get_database()
-    
-    # Check if student already exists
-    if db.students.find_one({"email": student.email}):
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    # Hash password and save
+async def register_student(student: StudentCreate):
+    # Credentials (hash) and profile are stored separately; duplicates are
+    # rejected by the credentials unique index
     student_dict = student.dict()
-    student_dict["password_hash"] = get_password_hash(student.password)
-    student_dict["isVerified"] = False # Default to False
     del student_dict["password"]
-    
-    result = db.students.insert_one(student_dict)
+    await auth_service.register("student", student.email, student.password, student_dict, verified=False)
     
     # Create token
     access_token = create_access_token(data={"sub": student.email, "role": "student", "isVerified": False})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login", response_model=Token)
-def login_student(login_data: UserLogin):
-    db = get_database()
-    student = db.students.find_one({"email": login_data.email})
-    
+async def login_student(login_data: UserLogin):
     # DEBUG BYPASS
     if (login_data.email in ["abc@gmail.com", "student@gmail.com"]) and (login_data.password == "1234"):
+        student = await auth_service.find_credential("student", login_data.email)
         if not student:
              student = {"email": login_data.email, "role": "student", "isVerified": True} # Auto-verify debug users
         
@@ -42,45 +34,41 @@ def login_student(login_data: UserLogin):
         access_token = create_access_token(data={"sub": student["email"], "role": "student", "isVerified": is_verified})
         return {"access_token": access_token, "token_type": "bearer"}
 
-    if not student or not verify_password(login_data.password, student["password_hash"]):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    student = await auth_service.authenticate("student", login_data.email, login_data.password)
     
     is_verified = student.get("isVerified", False)
     access_token = create_access_token(data={"sub": student["email"], "role": "student", "isVerified": is_verified})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/onboarding")
-def complete_onboarding(student_update: StudentUpdate):
+def complete_onboarding(student_update: StudentUpdate, user: dict = Depends(get_optional_user)):
     db = get_database()
     
-    # In a real app, we'd get the user email from the token dependency
-    # For MVP, we'll assume the email is passed or we verify it another way
-    # Ideally, this endpoint should depend on 'get_current_user'
+    # The email still comes from the payload for MVP clients; when a token is
+    # sent it must belong to that student (see AUTH_REQUIRED)
     
     if not student_update.email:
          raise HTTPException(status_code=400, detail="Email required for identification")
+    authorize_email(user, student_update.email)
 
     # Filter out None values
     update_data = {k: v for k, v in student_update.dict().items() if v is not None}
     
-    result = db.students.update_one(
-        {"email": student_update.email},
-        {"$set": update_data}
-    )
+    is_verified = update_data.pop("isVerified", False)
+    before = counters.set_verified(db.students, student_update.email, is_verified, extra=update_data)
     
-    if result.matched_count == 0:
+    if before is None:
         raise HTTPException(status_code=404, detail="Student not found")
+    counters.track_verification_change(db, "students", before, now_verified=is_verified)
+    auth_service.sync_verification(db, "student", student_update.email, is_verified)
         
     return {"message": "Onboarding completed successfully"}
 
 @router.get("/me/{email}", response_model=StudentResponse)
-def get_student_profile(email: str):
+def get_student_profile(email: str, user: dict = Depends(get_optional_user)):
+    authorize_email(user, email)
     db = get_database()
-    student = db.students.find_one({"email": email})
+    student = find_student_profile(db, email)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
         
@@ -1,11 +1,15 @@
 import os
 from groq import Groq
 from backend.config import settings
-from backend.database import db
+from backend.database import async_db
 from backend.gd_schemas import TranscriptEntry, ParticipantRole
+from backend.repository import PROJECTIONS
+from backend.services.turn_scheduler import TurnScheduler
+from backend.services.room_lease import acquire_turn_lease, release_turn_lease
+from backend.services.transcript_hub import transcript_hub
+from backend.services.evaluation_jobs import request_evaluation
 import logging
-from datetime import datetime
-import time
+from datetime import datetime, timedelta
 import random
 
 logger = logging.getLogger(__name__)
@@ -25,57 +29,55 @@ else:
 
 print(f"Initialized {len(clients)} Groq clients.")
 
-# Global lock set to prevent concurrent processing/race conditions
-processing_locks = set()
-
-def process_ai_turn(roomId: str, is_silence_breaker: bool = False):
+async def take_ai_turn(roomId: str):
     """
     Reads the next line from the pre-generated script and assigns it to a suitable bot.
     NO API CALLS during conversation - just reads pre-generated script.
+    Runs when the room's turn timer fires; the natural pause is the timer itself.
     """
-    if roomId in processing_locks:
-        return
+    database = async_db.get_db()
 
-    processing_locks.add(roomId)
+    # 1. Take the room's turn lease; the same atomic update returns the next script line
+    lease = await acquire_turn_lease(database, roomId, PROJECTIONS["script_cursor"])
+    if lease is None:
+        return # Another worker is taking this room's turn
+    owner, room = lease
     
     try:
-        database = db.get_db()
-
-        # 1. Get Room Data (Script & Index)
-        room = database["rooms"].find_one({"roomId": roomId})
-        if not room or "script" not in room or not room["script"]:
-            return
-
-        script = room["script"]
         index = room.get("current_script_index", 0)
 
-        if index >= len(script):
-            print(f"Script finished for room {roomId}.")
+        if index >= room.get("script_length", 0):
+            if not room.get("scriptComplete", True):
+                streamed_at = room.get("scriptStreamedAt")
+                stall = timedelta(seconds=settings.SCRIPT_STREAM_STALL_SECONDS)
+                if isinstance(streamed_at, datetime) and datetime.utcnow() - streamed_at.replace(tzinfo=None) < stall:
+                    # Caught up with a script that is still streaming in: check back shortly
+                    turn_scheduler.schedule(roomId, reset=False, delay=settings.SCRIPT_FRONTIER_POLL_SECONDS)
+                    return
+                # The stream died or its last push failed: the script ends where it is
+                logger.warning(f"Script stream for room {roomId} stalled, closing it at {room.get('script_length', 0)} turns")
+                await database["rooms"].update_one({"roomId": roomId, "scriptComplete": False}, {"$set": {"scriptComplete": True}})
+            if room.get("script_length"):
+                print(f"Script finished for room {roomId}.")
+                # Precompute the room's results before anyone asks for them
+                await request_evaluation(database, roomId)
             return
 
-        # Natural pause before Bot speaks (Increased to 7s for better flow)
-        time.sleep(7)
-
-        # Re-check updated index & barge-in during sleep
-        room_after = database["rooms"].find_one({"roomId": roomId})
-        index_after = room_after.get("current_script_index", 0)
-        is_user_talking = room_after.get("isUserTalking", False)
-        
-        if index != index_after or is_user_talking:
-            if is_user_talking:
-                print(f"DEBUG: AI Turn aborted due to User Barge-in in room {roomId}")
+        # Barge-in that raced the timer (or came through another worker)
+        if room.get("isUserTalking", False):
+            print(f"DEBUG: AI Turn aborted due to User Barge-in in room {roomId}")
             return
 
         # 2. Get Next Line
-        next_turn = script[index]
+        next_turn = room.get("next_turn") or {}
         sentiment = next_turn.get("sentiment", "Neutral")
         text = next_turn.get("text", "...")
 
         # 3. Select a Bot based on Sentiment (optional) or Random
-        ai_participants = list(database["participants"].find({
+        ai_participants = await database["participants"].find({
             "roomId": roomId,
             "role": ParticipantRole.AI
-        }))
+        }, PROJECTIONS["participant_peer"]).to_list()
         
         if not ai_participants:
             print("No AI participants found in room.")
@@ -84,7 +86,16 @@ def process_ai_turn(roomId: str, is_silence_breaker: bool = False):
         # Pick one randomly
         selected_ai = random.choice(ai_participants)
         
-        # 4. Speak (Store Transcript)
+        # 4. Claim the line: compare-and-set on the index, so even a holder
+        # whose lease expired mid-turn cannot post the same line twice
+        claimed = await database["rooms"].update_one(
+            {"roomId": roomId, "current_script_index": index},
+            {"$inc": {"current_script_index": 1}, "$max": {"lastTranscriptAt": datetime.utcnow()}}
+        )
+        if claimed.modified_count == 0:
+            return
+        
+        # 5. Speak (Store Transcript)
         ai_entry = TranscriptEntry(
             sessionId=room["sessionId"],
             roomId=roomId,
@@ -93,15 +104,25 @@ def process_ai_turn(roomId: str, is_silence_breaker: bool = False):
             timestamp=datetime.utcnow(),
         )
         
-        database["transcripts"].insert_one(ai_entry.model_dump())
+        doc = {**ai_entry.model_dump(), "scriptIndex": index}
+        await database["transcripts"].insert_one(doc)
+        transcript_hub.publish(doc)
         logger.info(f"AI Response in {roomId}: {text}")
         print(f"AI Response Generated: {text}")
-        
-        # 5. Advance Script Index
-        database["rooms"].update_one(
-            {"roomId": roomId},
-            {"$inc": {"current_script_index": 1}}
-        )
 
     finally:
-        processing_locks.discard(roomId)
+        await release_turn_lease(database, roomId, owner)
+
+turn_scheduler = TurnScheduler(take_ai_turn, delay=settings.AI_TURN_DELAY_SECONDS)
+
+def process_ai_turn(roomId: str, is_silence_breaker: bool = False):
+    """
+    Arms the room's next AI line; returns immediately.
+    A new utterance restarts the pause, while silence-breaker polls only join
+    a turn that is already pending. Safe to call from worker threads.
+    """
+    turn_scheduler.schedule(roomId, reset=not is_silence_breaker)
+
+def cancel_ai_turn(roomId: str):
+    """ Barge-in: the human started talking, drop the pending bot line. """
+    turn_scheduler.cancel(roomId)
@@ -1,116 +1,190 @@
-from backend.services.script_generator import generate_topic_script
-import random
 import uuid
 import time
 from datetime import datetime
-from backend.constants import GD_TOPICS
-from backend.database import db
 from backend.gd_schemas import ParticipantRole, ParticipantModel, RoomModel, TranscriptEntry
+from backend.repository import PROJECTIONS
+from pymongo import UpdateMany, UpdateOne
 from .ai_agent import process_ai_turn
+from .transcript_hub import transcript_hub
+from .script_pool import script_pool
+from .script_stream import shared_stream
+from backend.config import settings
 
 from concurrent.futures import ThreadPoolExecutor
 
-# Parallel executor for script generation
-executor = ThreadPoolExecutor(max_workers=10)
+ROOM_SIZE = 5
 
-def process_single_room(group, sessionId, database):
-    """ Helper to process a single room's creation in parallel. """
-    try:
-        human_count = len(group)
-        ai_needed = 5 - human_count
-        
-        room_id = str(uuid.uuid4())
-        room_participants = []
-        
-        # Add Humans
-        for human in group:
-            room_participants.append(human["peerId"])
-            database["participants"].update_one(
-                {"_id": human["_id"]},
-                {"$set": {"roomId": room_id}}
-            )
-            
-        # Add AI
-        for _ in range(ai_needed):
-            ai_peer_id = f"ai-{uuid.uuid4()}"
-            ai_participant = ParticipantModel(
-                participantId=str(uuid.uuid4()),
-                sessionId=sessionId,
-                peerId=ai_peer_id,
-                role=ParticipantRole.AI,
-                name=f"AI Student", 
-                roomId=room_id
-            )
-            database["participants"].insert_one(ai_participant.model_dump())
-            room_participants.append(ai_peer_id)
-            
-        # Select Random Topic & Generate Script
-        topic = random.choice(GD_TOPICS)
-        print(f"[Allocation] Room {room_id}: Generating script for topic '{topic}'...")
-        script = generate_topic_script(topic)
+# Bounded executor for room building (script claims, on-demand generation) and room writes
+executor = ThreadPoolExecutor(max_workers=settings.ALLOCATION_ROOM_CONCURRENCY)
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+def _ai_ids(room_id: str, seat: int):
+    """ Deterministic (participantId, peerId) for a room's AI seat, so rebuilding a room never adds new bots. """
+    participant_id = uuid.uuid5(uuid.NAMESPACE_URL, f"mockello/{room_id}/ai/{seat}")
+    peer_id = uuid.uuid5(uuid.NAMESPACE_URL, f"mockello/{room_id}/ai-peer/{seat}")
+    return str(participant_id), f"ai-{peer_id}"
+
+def process_single_room(database, group, sessionId, room_id: str = None):
+    """
+    Builds a single room. Only the script claim does I/O (a pooled script, or
+    generation on a pool miss); every other DB write is returned as a plan
+    and flushed by `flush_rooms`. Given the same room_id and group, the plan
+    writes the same participants and room, so a retried room is idempotent.
+    A room that already exists (a retry, or a re-run allocation) only gets its
+    seats re-applied: no script is claimed or generated and no greeting sent.
+    """
+    existing = None
+    if room_id:
+        existing = database["rooms"].find_one({"roomId": room_id}, {"_id": 0, "aiCount": 1})
+    room_id = room_id or str(uuid.uuid4())
+
+    human_count = len(group)
+    ai_needed = existing["aiCount"] if existing else ROOM_SIZE - human_count
+    room_participants = [human["peerId"] for human in group]
+    
+    # Humans: one multi-document update per room, never moving anyone seated elsewhere
+    participant_ops = [UpdateMany(
+        {"_id": {"$in": [human["_id"] for human in group]}, "roomId": {"$in": [None, room_id]}},
+        {"$set": {"roomId": room_id}}
+    )]
         
-        # Create Room
-        room = RoomModel(
-            roomId=room_id,
+    # Add AI
+    for seat in range(ai_needed):
+        ai_participant_id, ai_peer_id = _ai_ids(room_id, seat)
+        ai_participant = ParticipantModel(
+            participantId=ai_participant_id,
             sessionId=sessionId,
-            participants=room_participants,
-            aiCount=ai_needed,
-            topic=topic,
-            script=script,
-            current_script_index=0
+            peerId=ai_peer_id,
+            role=ParticipantRole.AI,
+            name=f"AI Student", 
+            roomId=room_id
         )
-        database["rooms"].insert_one(room.model_dump())
+        participant_ops.append(UpdateOne(
+            {"sessionId": sessionId, "participantId": ai_participant_id},
+            {"$setOnInsert": ai_participant.model_dump()},
+            upsert=True
+        ))
+        room_participants.append(ai_peer_id)
+
+    if existing:
+        return {"roomId": room_id, "participant_ops": participant_ops, "room": None, "greeting": None, "script_stream": None}
         
-        # Trigger Initial Greeting
-        if ai_needed > 0:
-            first_ai = room_participants[len(group)]
-            greeting_text = f"Hello everyone! The topic is {topic}. "
-            database["transcripts"].insert_one(TranscriptEntry(
-                sessionId=sessionId,
-                roomId=room_id,
-                speakerId=first_ai,
-                text=greeting_text,
-                timestamp=datetime.utcnow()
-            ).model_dump())
-            
-            # Start the AI turn logic
-            process_ai_turn(room_id)
-
-        print(f"[Allocation] Completed Room {room_id}")
-        return room_id
-
-    except Exception as e:
-        print(f"Error processing room: {e}")
-        return None
-
-def allocate_rooms(sessionId: str):
-    database = db.get_db()
+    # Random topic with a pre-generated script; on a pool miss, stream one (or
+    # join the topic's running stream) and start the room as soon as its first
+    # turns exist
+    topic, script = script_pool.claim(database, on_demand=not settings.SCRIPT_STREAMING)
+    script_stream = None
+    if script is None:
+        print(f"[Allocation] Room {room_id}: Streaming script for topic '{topic}'...")
+        script_stream = shared_stream(topic)
+        script = script_stream.first_turns(
+            settings.SCRIPT_STREAM_FIRST_TURNS,
+            timeout=settings.SCRIPT_STREAM_FIRST_TIMEOUT_SECONDS
+        )
+    else:
+        print(f"[Allocation] Room {room_id}: Claimed script for topic '{topic}'")
     
-    try:
-        waiting_humans = list(database["participants"].find({
-            "sessionId": sessionId,
-            "roomId": None,
-            "role": ParticipantRole.HUMAN.value
-        }))
-        
-        if not waiting_humans:
-            return {"message": "No waiting participants to allocate"}
-        
-        print(f"[Allocation] Starting parallel allocation for {len(waiting_humans)} humans")
+    room = RoomModel(
+        roomId=room_id,
+        sessionId=sessionId,
+        participants=room_participants,
+        aiCount=ai_needed,
+        topic=topic,
+        script=script,
+        current_script_index=0,
+        scriptComplete=script_stream is None
+    )
+    
+    # Initial Greeting
+    greeting = None
+    if ai_needed > 0:
+        first_ai = room_participants[len(group)]
+        greeting_text = f"Hello everyone! The topic is {topic}. "
+        greeting = TranscriptEntry(
+            sessionId=sessionId,
+            roomId=room_id,
+            speakerId=first_ai,
+            text=greeting_text,
+            timestamp=datetime.utcnow()
+        ).model_dump()
 
-        groups = [waiting_humans[i:i+5] for i in range(0, len(waiting_humans), 5)]
-        
-        # Run room processing in parallel
-        futures = []
-        for group in groups:
-            futures.append(executor.submit(process_single_room, group, sessionId, database))
-            
-        results = [f.result() for f in futures]
-        created_count = len([r for r in results if r is not None])
+    return {
+        "roomId": room_id,
+        "participant_ops": participant_ops,
+        "room": room.model_dump(),
+        "greeting": greeting,
+        "script_stream": script_stream
+    }
+
+def flush_rooms(database, plans) -> set:
+    """
+    Writes planned rooms with one bulk call per collection. Rooms and AI seats
+    are upserts keyed on the room, so flushing the same plan again changes
+    nothing. Returns the roomIds this call actually created.
+    """
+    participant_ops = [op for plan in plans for op in plan["participant_ops"]]
+
+    # Participants first so a room never exists without its members assigned
+    if participant_ops:
+        database["participants"].bulk_write(participant_ops, ordered=False)
+    new_plans = [plan for plan in plans if plan["room"] is not None]
+    if not new_plans:
+        return set()
+    result = database["rooms"].bulk_write([
+        UpdateOne({"roomId": plan["roomId"]}, {"$setOnInsert": plan["room"]}, upsert=True)
+        for plan in new_plans
+    ], ordered=False)
+    created = {new_plans[i]["roomId"] for i in result.upserted_ids}
+
+    # The greeting opens a room exactly once
+    greetings = [plan["greeting"] for plan in plans if plan["greeting"] and plan["roomId"] in created]
+    if greetings:
+        database["transcripts"].insert_many(greetings, ordered=False)
+        for greeting in greetings:
+            transcript_hub.publish(greeting)
+    return created
+
+def allocate_room(database, sessionId: str, room_id: str, human_ids: list) -> dict:
+    """
+    Builds and writes one planned room of an allocation job (worker thread,
+    sync pymongo). Safe to run again for the same room_id: humans already
+    seated in it are kept, anything already written is left as is.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    group = list(database["participants"].find(
+        {"_id": {"$in": human_ids}, "roomId": {"$in": [None, room_id]}},
+        PROJECTIONS["waiting_human"]
+    ))
+    # Keep the planned seat order so a rebuilt room gets the same AI seats
+    order = {human_id: i for i, human_id in enumerate(human_ids)}
+    group.sort(key=lambda human: order[human["_id"]])
+    if not group:
+        return {"roomId": room_id, "humans": 0, "created": False, "timings": timings}
+
+    phase = time.perf_counter()
+    plan = process_single_room(database, group, sessionId, room_id)
+    timings["build_ms"] = _elapsed_ms(phase)
+
+    phase = time.perf_counter()
+    created = room_id in flush_rooms(database, [plan])
+    timings["flush_ms"] = _elapsed_ms(phase)
 
-        return {"message": "Allocation complete", "rooms_created": created_count}
+    # A streaming script appends its remaining turns now that the room exists.
+    # Only a room lost in a race gets here with a stream of its own; that one is dropped
+    if plan["script_stream"]:
+        if created:
+            plan["script_stream"].attach(database, room_id, len(plan["room"]["script"]))
+        else:
+            plan["script_stream"].cancel()
 
-    except Exception as e:
-        print(f"CRITICAL ERROR in allocate_rooms: {e}")
-        return {"error": str(e)}
+    # Start the AI turn logic (an existing room's timer is already running)
+    if plan["greeting"] and created:
+        process_ai_turn(room_id)
 
+    timings["total_ms"] = _elapsed_ms(started)
+    print(f"[Allocation] Completed Room {room_id} ({len(group)} humans, created={created})")
+    return {"roomId": room_id, "humans": len(group), "created": created, "timings": timings}
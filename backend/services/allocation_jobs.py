@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from backend.config import settings
+from backend.database import async_db, db
+from backend.gd_schemas import ParticipantRole
+from backend.repository import PROJECTIONS
+from backend.services.allocation import ROOM_SIZE, allocate_room, executor
+from backend.services.lobby_events import lobby_events
+from backend.services.room_lease import WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+# Room allocation as a persisted job: one document per session in
+# `allocation_jobs`, holding the planned rooms (roomId + the humans seated in
+# it) and each room's progress. Workers claim a job with a lease and keep it
+# alive with a heartbeat, so a job whose worker died is picked up again and
+# finishes only the rooms that are not done - every room write is idempotent.
+#
+#   {sessionId, status: queued|running|done|failed, attempts, owner,
+#    leaseExpiresAt, notBefore, rooms: [{roomId, humans, status, attempts, error}]}
+
+ALLOCATION_JOBS_COLLECTION = "allocation_jobs"
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+async def enqueue(database, session_id: str, rerun: bool = False) -> dict:
+    """
+    Creates the session's allocation job (at most one per session). With
+    `rerun`, a finished job is queued again: it retries failed rooms and
+    seats any humans who are still without a room.
+    """
+    now = datetime.utcnow()
+    job = await database[ALLOCATION_JOBS_COLLECTION].find_one_and_update(
+        {"sessionId": session_id},
+        {"$setOnInsert": {
+            "sessionId": session_id,
+            "status": QUEUED,
+            "attempts": 0,
+            "rooms": [],
+            "notBefore": now,
+            "createdAt": now,
+        }},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    if rerun and job["status"] in (DONE, FAILED):
+        job = await database[ALLOCATION_JOBS_COLLECTION].find_one_and_update(
+            {"sessionId": session_id, "status": {"$in": [DONE, FAILED]}},
+            {"$set": {"status": QUEUED, "attempts": 0, "notBefore": now, "error": None, "updatedAt": now}},
+            return_document=ReturnDocument.AFTER
+        ) or job
+
+    allocation_worker.wake()
+    return job
+
+
+def progress(job: dict) -> dict:
+    """ Public view of a job: overall state plus per-room progress. """
+    rooms = job.get("rooms", [])
+    counts = {status: sum(1 for r in rooms if r["status"] == status) for status in ("pending", DONE, FAILED)}
+    return {
+        "sessionId": job["sessionId"],
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+        "error": job.get("error"),
+        "createdAt": job.get("createdAt"),
+        "finishedAt": job.get("finishedAt"),
+        "rooms_total": len(rooms),
+        "rooms_done": counts[DONE],
+        "rooms_failed": counts[FAILED],
+        "rooms_pending": counts["pending"],
+        "rooms": [
+            {
+                "roomId": r["roomId"],
+                "humans": len(r.get("humans", [])),
+                "status": r["status"],
+                "attempts": r.get("attempts", 0),
+                "error": r.get("error"),
+                "timings": r.get("timings"),
+            }
+            for r in rooms
+        ],
+    }
+
+
+class AllocationWorker:
+    """
+    Runs up to ALLOCATION_MAX_JOBS jobs at once on this worker; rooms inside a
+    job are built on the bounded allocation executor.
+    """
+
+    def __init__(self):
+        self._tasks = []
+        self._loop = None
+        self._wakeup = None
+        self.metrics = {"claimed": 0, "done": 0, "retried": 0, "failed": 0, "rooms_done": 0, "rooms_failed": 0}
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [self._loop.create_task(self._run()) for _ in range(settings.ALLOCATION_MAX_JOBS)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def wake(self):
+        """ Thread-safe nudge after enqueueing, instead of waiting for the next poll. """
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def snapshot(self) -> dict:
+        return {**self.metrics, "slots": len(self._tasks)}
+
+    # --- Queue ---
+
+    async def _claim(self, database):
+        now = datetime.utcnow()
+        owner = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+        return await database[ALLOCATION_JOBS_COLLECTION].find_one_and_update(
+            {"$or": [
+                {"status": QUEUED, "notBefore": {"$lte": now}},
+                # Lease ran out: the worker holding it died mid-job
+                {"status": RUNNING, "leaseExpiresAt": {"$lte": now}},
+            ]},
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "owner": owner,
+                    "leaseExpiresAt": now + timedelta(seconds=settings.ALLOCATION_LEASE_SECONDS),
+                    "updatedAt": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("createdAt", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _run(self):
+        database = async_db.get_db()
+        while True:
+            try:
+                job = await self._claim(database)
+                if job is not None:
+                    self.metrics["claimed"] += 1
+                    await self._process(database, job)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Allocation worker error: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.ALLOCATION_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _heartbeat(self, database, session_id: str, owner: str):
+        while True:
+            await asyncio.sleep(settings.ALLOCATION_HEARTBEAT_SECONDS)
+            result = await database[ALLOCATION_JOBS_COLLECTION].update_one(
+                {"sessionId": session_id, "owner": owner},
+                {"$set": {"leaseExpiresAt": datetime.utcnow() + timedelta(seconds=settings.ALLOCATION_LEASE_SECONDS)}}
+            )
+            if result.matched_count == 0:
+                logger.warning(f"Lost allocation lease for session {session_id}")
+                return
+
+    # --- Job ---
+
+    async def _plan(self, database, job: dict) -> list:
+        """ Adds rooms for humans still waiting that no planned room covers yet. """
+        planned = {human for room in job["rooms"] for human in room["humans"]}
+        waiting = await database["participants"].find({
+            "sessionId": job["sessionId"],
+            "roomId": None,
+            "role": ParticipantRole.HUMAN.value
+        }, PROJECTIONS["waiting_human"]).sort("joinedAt", 1).to_list()
+
+        new_humans = [human["_id"] for human in waiting if human["_id"] not in planned]
+        new_rooms = [
+            {"roomId": str(uuid.uuid4()), "humans": new_humans[i:i + ROOM_SIZE], "status": "pending", "attempts": 0}
+            for i in range(0, len(new_humans), ROOM_SIZE)
+        ]
+        if new_rooms:
+            await database[ALLOCATION_JOBS_COLLECTION].update_one(
+                {"sessionId": job["sessionId"], "owner": job["owner"]},
+                {"$push": {"rooms": {"$each": new_rooms}}}
+            )
+        return job["rooms"] + new_rooms
+
+    async def _set_room(self, database, job: dict, room_id: str, fields: dict):
+        await database[ALLOCATION_JOBS_COLLECTION].update_one(
+            {"sessionId": job["sessionId"], "owner": job["owner"]},
+            {
+                "$set": {f"rooms.$[r].{k}": v for k, v in fields.items()},
+                "$inc": {"rooms.$[r].attempts": 1},
+            },
+            array_filters=[{"r.roomId": room_id}]
+        )
+
+    async def _run_room(self, database, job: dict, room: dict) -> bool:
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                executor, allocate_room, db.get_db(), job["sessionId"], room["roomId"], room["humans"]
+            )
+        except Exception as e:
+            logger.error(f"Allocation of room {room['roomId']} failed: {e}")
+            self.metrics["rooms_failed"] += 1
+            await self._set_room(database, job, room["roomId"], {"status": FAILED, "error": str(e)})
+            return False
+
+        self.metrics["rooms_done"] += 1
+        await self._set_room(database, job, room["roomId"], {
+            "status": DONE,
+            "error": None,
+            "timings": result["timings"],
+            "finishedAt": datetime.utcnow(),
+        })
+        lobby_events.notify(job["sessionId"]) # Lobby streams push the room right away
+        return True
+
+    async def _process(self, database, job: dict):
+        session_id = job["sessionId"]
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(database, session_id, job["owner"]))
+        try:
+            rooms = await self._plan(database, job)
+            todo = [room for room in rooms if room["status"] != DONE]
+            print(f"[Allocation] Job {session_id}: {len(todo)}/{len(rooms)} rooms to build (attempt {job['attempts']})")
+            results = await asyncio.gather(*(self._run_room(database, job, room) for room in todo))
+
+            now = datetime.utcnow()
+            if all(results):
+                update = {"status": DONE, "finishedAt": now, "error": None}
+                self.metrics["done"] += 1
+            elif job["attempts"] < settings.ALLOCATION_MAX_ATTEMPTS:
+                # Retry the failed rooms with a linear backoff
+                update = {"status": QUEUED, "notBefore": now + timedelta(seconds=settings.ALLOCATION_RETRY_SECONDS * job["attempts"])}
+                self.metrics["retried"] += 1
+            else:
+                update = {"status": FAILED, "finishedAt": now, "error": f"{results.count(False)} rooms failed"}
+                self.metrics["failed"] += 1
+        except Exception as e:
+            logger.error(f"Allocation job {session_id} failed: {e}")
+            now = datetime.utcnow()
+            retry = job["attempts"] < settings.ALLOCATION_MAX_ATTEMPTS
+            update = {"status": QUEUED if retry else FAILED, "error": str(e), "notBefore": now + timedelta(seconds=settings.ALLOCATION_RETRY_SECONDS)}
+        finally:
+            heartbeat.cancel()
+
+        await database[ALLOCATION_JOBS_COLLECTION].update_one(
+            {"sessionId": session_id, "owner": job["owner"]},
+            {"$set": {**update, "updatedAt": now}, "$unset": {"owner": "", "leaseExpiresAt": ""}}
+        )
+
+
+allocation_worker = AllocationWorker()
@@ -0,0 +1,109 @@
+from datetime import datetime
+from fastapi import HTTPException, status
+from pymongo.errors import DuplicateKeyError
+from backend.database import get_async_database
+from backend.auth import get_password_hash_async, verify_password_async, rehash_if_needed
+from backend.repository import find_login
+from backend.services import counters
+
+# One credentials row per (email, role): just the hash and the verification
+# flag, behind a unique index. Login is a single indexed lookup that never
+# touches the (large) profile documents, and registration relies on the
+# unique index instead of a racy find_one-then-insert.
+
+CREDENTIALS_COLLECTION = "credentials"
+
+PROFILE_COLLECTIONS = {
+    "student": "students",
+    "college": "colleges",
+    "company": "companies",
+    "admin": "admins",
+}
+
+CREDENTIAL_PROJECTION = {"email": 1, "role": 1, "password_hash": 1, "isVerified": 1}
+
+
+def _credential(role: str, email: str, password_hash: str, verified: bool) -> dict:
+    return {
+        "email": email,
+        "role": role,
+        "password_hash": password_hash,
+        "isVerified": verified,
+        "created_at": datetime.utcnow()
+    }
+
+async def find_credential(role: str, email: str):
+    database = get_async_database()
+    return await database[CREDENTIALS_COLLECTION].find_one({"email": email, "role": role}, CREDENTIAL_PROJECTION)
+
+async def _migrate_legacy(role: str, email: str):
+    """ Creates the credentials row for an account registered before the collection existed. """
+    database = get_async_database()
+    profile = await find_login(database[PROFILE_COLLECTIONS[role]], email)
+    if not profile or not profile.get("password_hash"):
+        return None
+
+    credential = _credential(role, email, profile["password_hash"], profile.get("isVerified", False))
+    try:
+        await database[CREDENTIALS_COLLECTION].insert_one(credential)
+    except DuplicateKeyError:
+        return await find_credential(role, email)
+    return credential
+
+async def register(role: str, email: str, password: str, profile: dict, verified: bool = False):
+    """
+    Creates credentials + profile for a new account. Raises 400 if the email
+    is already registered for this role.
+    """
+    database = get_async_database()
+    password_hash = await get_password_hash_async(password)
+
+    try:
+        await database[CREDENTIALS_COLLECTION].insert_one(_credential(role, email, password_hash, verified))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    # Accounts created before the credentials collection only exist as
+    # profiles; the unique email index on the profile collection catches them
+    try:
+        await database[PROFILE_COLLECTIONS[role]].insert_one({**profile, "email": email, "isVerified": verified})
+    except Exception as e:
+        await database[CREDENTIALS_COLLECTION].delete_one({"email": email, "role": role})
+        if isinstance(e, DuplicateKeyError):
+            raise HTTPException(status_code=400, detail="Email already registered")
+        raise
+
+    if role != "admin":
+        await counters.role_registered(database, PROFILE_COLLECTIONS[role], verified=verified)
+
+async def authenticate(role: str, email: str, password: str) -> dict:
+    """ Returns the credentials row for a correct email/password, else raises 401. """
+    credential = await find_credential(role, email)
+    if credential is None:
+        credential = await _migrate_legacy(role, email)
+
+    if not credential or not await verify_password_async(password, credential["password_hash"]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    database = get_async_database()
+    await rehash_if_needed(database[CREDENTIALS_COLLECTION], credential, password)
+    return credential
+
+def sync_verification(database, role: str, email: str, verified: bool):
+    """ Mirrors a profile's isVerified change onto its credentials row. """
+    return database[CREDENTIALS_COLLECTION].update_one(
+        {"email": email, "role": role},
+        {"$set": {"isVerified": verified}}
+    )
+
+def set_password_hash(database, role: str, email: str, password_hash: str):
+    """ Upserts a credentials row with a given hash (debug/reset endpoints, sync pymongo). """
+    return database[CREDENTIALS_COLLECTION].update_one(
+        {"email": email, "role": role},
+        {"$set": {"password_hash": password_hash}, "$setOnInsert": {"isVerified": False, "created_at": datetime.utcnow()}},
+        upsert=True
+    )
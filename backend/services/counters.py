@@ -0,0 +1,127 @@
+import time
+from datetime import datetime
+from pymongo import ReturnDocument
+from backend.config import settings
+from backend.gd_schemas import SessionStatus
+
+# Dashboard counters kept in a single document and bumped with $inc by the
+# endpoints that change them, so /admin/stats is one find_one (behind a short
+# TTL cache) instead of collection-wide counts.
+#
+# Like backend/repository.py, helpers return whatever the driver returns:
+# a result for the sync handle, an awaitable for the async one.
+
+COUNTERS_COLLECTION = "counters"
+STATS_ID = "stats"
+
+ROLE_COLLECTIONS = {
+    "students": "students",
+    "colleges": "colleges",
+    "companies": "companies",
+}
+
+_cache = {"value": None, "expires": 0.0}
+
+
+def invalidate_cache():
+    _cache["value"] = None
+    _cache["expires"] = 0.0
+
+def bump(database, increments: dict):
+    invalidate_cache()
+    return database[COUNTERS_COLLECTION].update_one(
+        {"_id": STATS_ID},
+        {"$inc": increments},
+        upsert=True
+    )
+
+# --- Role counters ---
+
+def role_registered(database, role: str, verified: bool = False):
+    state = "verified" if verified else "pending"
+    return bump(database, {f"{role}.total": 1, f"{role}.{state}": 1})
+
+def role_verified(database, role: str):
+    return bump(database, {f"{role}.verified": 1, f"{role}.pending": -1})
+
+def role_unverified(database, role: str):
+    return bump(database, {f"{role}.verified": -1, f"{role}.pending": 1})
+
+def track_verification_change(database, role: str, before, now_verified: bool):
+    """
+    Applies the counter change implied by an update that set isVerified, given
+    the pre-image returned by find_one_and_update (None when it upserted).
+    Returns None when nothing changed.
+    """
+    if before is None:
+        return role_registered(database, role, verified=now_verified)
+
+    was_verified = bool(before.get("isVerified", False))
+    if was_verified == now_verified:
+        return None
+    return role_verified(database, role) if now_verified else role_unverified(database, role)
+
+def set_verified(collection, email: str, verified: bool, upsert: bool = False, extra: dict = None):
+    """
+    Sets isVerified (plus any `extra` fields) and returns the pre-image,
+    projected to isVerified, for `track_verification_change`.
+    """
+    return collection.find_one_and_update(
+        {"email": email},
+        {"$set": {**(extra or {}), "isVerified": verified}},
+        projection={"isVerified": 1},
+        upsert=upsert,
+        return_document=ReturnDocument.BEFORE
+    )
+
+# --- GD / results counters ---
+
+def session_created(database):
+    return bump(database, {f"sessions.{SessionStatus.WAITING.value}": 1})
+
+def session_transition(database, from_status: SessionStatus, to_status: SessionStatus):
+    return bump(database, {f"sessions.{from_status.value}": -1, f"sessions.{to_status.value}": 1})
+
+def result_recorded(database, round_type: str, count: int = 1):
+    return bump(database, {f"results.{round_type or 'other'}": count})
+
+# --- Read path ---
+
+def rebuild(database) -> dict:
+    """ Full recount (sync pymongo). Used on first read and to correct drift. """
+    from backend.services.score_ledger import LEDGER_COLLECTION
+
+    stats = {"_id": STATS_ID, "rebuilt_at": datetime.utcnow()}
+
+    for role, col_name in ROLE_COLLECTIONS.items():
+        total = database[col_name].count_documents({})
+        verified = database[col_name].count_documents({"isVerified": True})
+        stats[role] = {"total": total, "verified": verified, "pending": total - verified}
+
+    stats["sessions"] = {s.value: 0 for s in SessionStatus}
+    for row in database["sessions"].aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+        stats["sessions"][str(row["_id"])] = row["count"]
+
+    stats["results"] = {}
+    for row in database[LEDGER_COLLECTION].aggregate([{"$group": {"_id": "$round_type", "count": {"$sum": 1}}}]):
+        stats["results"][row["_id"] or "other"] = row["count"]
+
+    database[COUNTERS_COLLECTION].replace_one({"_id": STATS_ID}, stats, upsert=True)
+    invalidate_cache()
+    return stats
+
+def get_stats(database, refresh: bool = False) -> dict:
+    """ Cached counters document (sync pymongo), rebuilt when missing or on request. """
+    now = time.monotonic()
+    if not refresh and _cache["value"] is not None and now < _cache["expires"]:
+        return _cache["value"]
+
+    stats = None if refresh else database[COUNTERS_COLLECTION].find_one({"_id": STATS_ID})
+    if not stats or "rebuilt_at" not in stats:
+        # Only $inc deltas so far (or nothing) - establish the baseline
+        stats = rebuild(database)
+
+    stats.pop("_id", None)
+    _cache["value"] = stats
+    _cache["expires"] = now + settings.STATS_CACHE_TTL_SECONDS
+    return stats
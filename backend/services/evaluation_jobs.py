@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from backend.config import settings
+from backend.database import async_db
+from backend.services import gd_evaluator
+from backend.services.room_lease import WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+# Background GD evaluation. A room's evaluation state lives on the room
+# document itself, `evaluation: {status, attempts, owner, leaseExpiresAt, ...}`,
+# and is claimed with a leased findOneAndUpdate (like the turn lease), so any
+# worker can run it and a crashed one only delays it by the lease.
+# Rooms are queued when their script finishes or their transcript goes quiet,
+# so results are usually in `gd_results` before anyone asks for them.
+
+QUEUED, RUNNING, DONE, FAILED, EMPTY = "queued", "running", "done", "failed", "empty"
+
+
+async def request_evaluation(database, room_id: str) -> bool:
+    """ Queues the room's evaluation unless it already has one. Returns True if queued now. """
+    now = datetime.utcnow()
+    result = await database["rooms"].update_one(
+        {"roomId": room_id, "evaluation": {"$exists": False}},
+        {"$set": {"evaluation": {"status": QUEUED, "attempts": 0, "queuedAt": now, "notBefore": now}}}
+    )
+    if result.modified_count:
+        evaluation_worker.wake()
+    return bool(result.modified_count)
+
+
+async def wait_for_evaluation(database, session_id: str, room_id: str, timeout: float) -> dict:
+    """
+    Queues the room if needed and waits for its results (peerId -> result):
+    attaches to the evaluation task when it runs in this process, claims and
+    starts the job here when it is still queued (rather than waiting behind
+    other rooms for a worker slot), otherwise follows the job's status on the
+    room. Returns None on timeout; raises LookupError for a room without
+    transcript, RuntimeError if the job failed.
+    """
+    await request_evaluation(database, room_id)
+    deadline = asyncio.get_running_loop().time() + timeout
+
+    while True:
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            return None
+
+        task = gd_evaluator.running_evaluation(session_id, room_id)
+        if task is not None:
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+        room = await database["rooms"].find_one({"roomId": room_id}, {"_id": 0, "evaluation": 1})
+        if room is None:
+            # No room document to queue on (older sessions): evaluate inline
+            return await gd_evaluator.evaluate_room_shared(database, session_id, room_id)
+
+        status = (room.get("evaluation") or {}).get("status")
+        if status == DONE:
+            return await gd_evaluator.stored_results(database, session_id, room_id)
+        if status == EMPTY:
+            raise LookupError("No transcripts found for this session.")
+        if status == FAILED:
+            raise RuntimeError(room["evaluation"].get("error") or "Evaluation failed")
+        if status == QUEUED and await evaluation_worker.run_now(database, room_id):
+            continue # Started here; the next pass attaches to its task
+
+        await asyncio.sleep(min(1.0, remaining))
+
+
+class EvaluationWorker:
+    """ Runs queued room evaluations (EVALUATION_MAX_JOBS at a time) and sweeps for inactive rooms. """
+
+    def __init__(self):
+        self._tasks = []
+        self._loop = None
+        self._wakeup = None
+        self._inline = set() # Jobs started by run_now
+        self.metrics = {"queued_by_sweep": 0, "done": 0, "empty": 0, "retried": 0, "failed": 0}
+
+    def start(self):
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [self._loop.create_task(self._run()) for _ in range(settings.EVALUATION_MAX_JOBS)]
+        self._tasks.append(self._loop.create_task(self._sweep_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def wake(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def snapshot(self) -> dict:
+        return {**self.metrics, "in_flight": gd_evaluator.running_count(), "prompt": dict(gd_evaluator.prompt_metrics)}
+
+    # --- Jobs ---
+
+    async def run_now(self, database, room_id: str) -> bool:
+        """
+        Claims this room's job (if it is due) and starts it outside the worker
+        slots. It runs as its own task, so a caller that times out or
+        disconnects does not leave the job half-finished.
+        """
+        room = await self._claim(database, room_id)
+        if room is None:
+            return False
+        task = asyncio.get_running_loop().create_task(self._process(database, room))
+        self._inline.add(task)
+        task.add_done_callback(self._inline.discard)
+        await asyncio.sleep(0) # Let it register its evaluation task before the caller looks for it
+        return True
+
+    async def _claim(self, database, room_id: str = None):
+        now = datetime.utcnow()
+        due = {"$or": [
+            {"evaluation.status": QUEUED, "evaluation.notBefore": {"$lte": now}},
+            {"evaluation.status": RUNNING, "evaluation.leaseExpiresAt": {"$lte": now}},
+        ]}
+        return await database["rooms"].find_one_and_update(
+            {**due, "roomId": room_id} if room_id else due,
+            {
+                "$set": {
+                    "evaluation.status": RUNNING,
+                    "evaluation.owner": f"{WORKER_ID}:{uuid.uuid4().hex[:8]}",
+                    "evaluation.leaseExpiresAt": now + timedelta(seconds=settings.EVALUATION_LEASE_SECONDS),
+                },
+                "$inc": {"evaluation.attempts": 1},
+            },
+            projection={"_id": 0, "roomId": 1, "sessionId": 1, "evaluation": 1},
+            sort=[("evaluation.notBefore", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _finish(self, database, room: dict, fields: dict):
+        await database["rooms"].update_one(
+            {"roomId": room["roomId"], "evaluation.owner": room["evaluation"]["owner"]},
+            {
+                "$set": {f"evaluation.{k}": v for k, v in fields.items()},
+                "$unset": {"evaluation.owner": "", "evaluation.leaseExpiresAt": ""},
+            }
+        )
+
+    async def _process(self, database, room: dict):
+        now = datetime.utcnow()
+        try:
+            await gd_evaluator.evaluate_room_shared(database, room["sessionId"], room["roomId"])
+        except LookupError:
+            self.metrics["empty"] += 1
+            await self._finish(database, room, {"status": EMPTY, "finishedAt": now})
+            return
+        except Exception as e:
+            logger.error(f"Evaluation of room {room['roomId']} failed: {e}")
+            attempts = room["evaluation"].get("attempts", 1)
+            if attempts < settings.EVALUATION_MAX_ATTEMPTS:
+                self.metrics["retried"] += 1
+                await self._finish(database, room, {
+                    "status": QUEUED,
+                    "error": str(e),
+                    "notBefore": now + timedelta(seconds=settings.EVALUATION_RETRY_SECONDS * attempts),
+                })
+            else:
+                self.metrics["failed"] += 1
+                await self._finish(database, room, {"status": FAILED, "error": str(e), "finishedAt": now})
+            return
+
+        self.metrics["done"] += 1
+        await self._finish(database, room, {"status": DONE, "error": None, "finishedAt": datetime.utcnow()})
+
+    async def _run(self):
+        database = async_db.get_db()
+        while True:
+            try:
+                room = await self._claim(database)
+                if room is not None:
+                    await self._process(database, room)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Evaluation worker error: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.EVALUATION_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    # --- Inactivity sweep ---
+
+    async def sweep(self) -> int:
+        """
+        Queues recent rooms whose transcript has been quiet for
+        EVALUATION_INACTIVITY_SECONDS (rooms.lastTranscriptAt, stamped on
+        every line). Only rooms created within EVALUATION_SWEEP_WINDOW_HOURS
+        are considered, so old rooms are never evaluated in bulk.
+        """
+        database = async_db.get_db()
+        now = datetime.utcnow()
+        quiet_since = now - timedelta(seconds=settings.EVALUATION_INACTIVITY_SECONDS)
+        rooms = await database["rooms"].find(
+            {
+                "evaluation": {"$exists": False},
+                "lastTranscriptAt": {"$lte": quiet_since},
+                "createdAt": {"$gte": now - timedelta(hours=settings.EVALUATION_SWEEP_WINDOW_HOURS)},
+            },
+            {"_id": 0, "roomId": 1}
+        ).sort("lastTranscriptAt", 1).limit(settings.EVALUATION_SWEEP_BATCH).to_list()
+
+        queued = 0
+        for room in rooms:
+            if await request_evaluation(database, room["roomId"]):
+                queued += 1
+        self.metrics["queued_by_sweep"] += queued
+        return queued
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Evaluation sweep failed: {e}")
+            await asyncio.sleep(settings.EVALUATION_SWEEP_SECONDS)
+
+
+evaluation_worker = EvaluationWorker()
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from groq import Groq
+from backend.config import settings
+from backend.gd_schemas import ParticipantRole
+from backend.models import GDResult
+from backend.repository import PROJECTIONS
+from backend.services.prompt_compaction import compact_conversation
+from backend.services.score_ledger import record_scores
+
+logger = logging.getLogger(__name__)
+
+# Room-level GD evaluation: every human in a room is scored by one structured
+# LLM call over the shared transcript, all results are stored with one
+# insert_many, and later per-peer requests are served from `gd_results`.
+
+AI_API_KEYS = os.getenv("AI_API_KEYS", "") or os.getenv("GROQ_API_KEY", "")
+keys = [k.strip() for k in AI_API_KEYS.split(",") if k.strip()]
+
+# One client per key, built once (not per request)
+clients = []
+for key in keys:
+    try:
+        clients.append(Groq(api_key=key))
+    except Exception as e:
+        logger.error(f"Failed to init Groq client key: {e}")
+
+executor = ThreadPoolExecutor(max_workers=10)
+
+CATEGORIES = ["Participation", "Uniqueness", "Creativity", "Choice of Words", "Leadership", "Listening"]
+
+# Prompt size across evaluations (estimated tokens, see prompt_compaction)
+prompt_metrics = {"evaluations": 0, "raw_tokens": 0, "prompt_tokens": 0, "tokens_saved": 0}
+
+SILENT_RESULT = {
+    "scores": {"Participation": 0, "Creativity": 0, "Communication": 0, "Leadership": 0},
+    "feedback": "You did not speak during the session.",
+    "strengths": [],
+    "improvements": ["Speak up to be heard!"],
+}
+
+
+def _coerce_scores(scores) -> dict:
+    """ Keeps the numeric category scores; models sometimes return "7" or "7/10". """
+    if not isinstance(scores, dict):
+        return {}
+    coerced = {}
+    for name, value in scores.items():
+        if isinstance(value, str):
+            value = value.split("/")[0].strip()
+        try:
+            coerced[name] = float(value)
+        except (TypeError, ValueError):
+            continue
+    return coerced
+
+
+def _result_fields(raw: dict) -> dict:
+    raw = raw if isinstance(raw, dict) else {}
+    return {
+        "scores": _coerce_scores(raw.get("scores")),
+        "feedback": raw.get("feedback") or "Analysis complete.",
+        "strengths": [str(s) for s in raw.get("strengths") or []],
+        "improvements": [str(s) for s in raw.get("improvements") or []],
+    }
+
+
+def _room_prompt(conversation_text: str, student_labels: list) -> str:
+    return f"""
+        Evaluate each of these students' performance (0-10) in this GD: {", ".join(student_labels)}.
+        Categories: {", ".join(CATEGORIES)}.
+        Conversation:
+        {conversation_text}
+        Return pure JSON with one entry per student label:
+        {{ "evaluations": {{ "<label>": {{ "scores": {{...}}, "feedback": "...", "strengths": [...], "improvements": [...] }} }} }}
+        """
+
+
+def _complete(prompt: str) -> dict:
+    if not clients:
+        raise RuntimeError("No AI clients available for evaluation.")
+    completion = random.choice(clients).chat.completions.create(
+        messages=[
+            {"role": "system", "content": "Return only JSON."},
+            {"role": "user", "content": prompt}
+        ],
+        model="llama-3.3-70b-versatile",
+        temperature=0.3,
+        response_format={"type": "json_object"}
+    )
+    return json.loads(completion.choices[0].message.content)
+
+
+async def stored_results(database, session_id: str, room_id: str) -> dict:
+    """ peerId -> stored result for the room (latest per peer). """
+    rows = await database["gd_results"].find(
+        {"session_id": session_id, "room_id": room_id},
+        {"_id": 0, "peer_id": 1, "scores": 1, "feedback": 1, "strengths": 1, "improvements": 1}
+    ).sort("created_at", 1).to_list()
+    return {row.pop("peer_id"): row for row in rows if row.get("peer_id")}
+
+
+async def _room_students(database, session_id: str, room_id: str, transcripts: list) -> dict:
+    """ peerId -> email for every human in the room: seated participants plus any non-AI speaker. """
+    participants = await database["participants"].find(
+        {"sessionId": session_id, "roomId": room_id, "role": ParticipantRole.HUMAN.value},
+        PROJECTIONS["participant_eval"]
+    ).to_list()
+    students = {p["peerId"]: p.get("email") for p in participants if p.get("peerId")}
+    for t in transcripts:
+        speaker = t["speakerId"]
+        if speaker not in students and not speaker.startswith("ai-"):
+            students[speaker] = None
+    return students
+
+
+async def _record_prompt_stats(database, room_id: str, stats: dict):
+    for name in ("raw_tokens", "prompt_tokens", "tokens_saved"):
+        prompt_metrics[name] += stats[name]
+    prompt_metrics["evaluations"] += 1
+    logger.info(
+        f"Room {room_id} evaluation prompt: {stats['prompt_tokens']} tokens "
+        f"({stats['tokens_saved']} saved of {stats['raw_tokens']})"
+    )
+    # Kept next to the room's job state (rooms evaluated as background jobs)
+    await database["rooms"].update_one(
+        {"roomId": room_id, "evaluation": {"$exists": True}},
+        {"$set": {"evaluation.prompt": stats}}
+    )
+
+
+async def evaluate_room(database, session_id: str, room_id: str) -> dict:
+    """
+    Scores every human in the room that has no stored result yet, with a
+    single LLM call, and stores them with one insert_many. Only run once the
+    room has ended (script done, quiet, or a student asked for results):
+    a stored result is final.
+    Returns peerId -> result for the whole room. Raises LookupError when the
+    room has no transcript, ValueError when the model's answer leaves a
+    student out.
+    """
+    results = await stored_results(database, session_id, room_id)
+
+    transcripts = await database["transcripts"].find(
+        {"sessionId": session_id, "roomId": room_id},
+        {"_id": 0, "speakerId": 1, "text": 1, "utteranceId": 1}
+    ).sort([("timestamp", 1), ("_id", 1)]).to_list()
+    if not transcripts:
+        raise LookupError("No transcripts found for this session.")
+
+    students = await _room_students(database, session_id, room_id, transcripts)
+    pending = [peer for peer in students if peer not in results]
+    if not pending:
+        return results
+
+    spoke = {t["speakerId"] for t in transcripts}
+    speakers = [peer for peer in pending if peer in spoke]
+    labels = {peer: f"STUDENT_{i + 1}" for i, peer in enumerate(speakers)}
+
+    new_results = {peer: dict(SILENT_RESULT) for peer in pending if peer not in spoke}
+    if speakers:
+        conversation_text, stats = compact_conversation(
+            transcripts, labels, settings.EVALUATION_PROMPT_TOKEN_BUDGET, settings.EVALUATION_OTHER_LINE_TOKENS
+        )
+        await _record_prompt_stats(database, room_id, stats)
+        prompt = _room_prompt(conversation_text, list(labels.values()))
+        loop = asyncio.get_running_loop()
+        raw = await loop.run_in_executor(executor, _complete, prompt)
+        evaluations = raw.get("evaluations", raw) if isinstance(raw, dict) else {}
+        # A student the model skipped must not get a stored placeholder: fail so the job retries
+        missing = [
+            label for label in labels.values()
+            if not isinstance(evaluations.get(label), dict) or not _coerce_scores(evaluations[label].get("scores"))
+        ]
+        if missing:
+            raise ValueError(f"Evaluation response has no scores for {', '.join(missing)}")
+        for peer, label in labels.items():
+            new_results[peer] = _result_fields(evaluations[label])
+
+    docs = [
+        GDResult(
+            student_email=students.get(peer) or "unknown@student.com",
+            session_id=session_id,
+            room_id=room_id,
+            peer_id=peer,
+            **result
+        ).model_dump()
+        for peer, result in new_results.items()
+    ]
+    await record_scores(database, docs, "gd_results")
+
+    results.update(new_results)
+    return results
+
+
+# In-process single-flight: concurrent requests for one room share one evaluation
+_inflight = {}
+
+async def evaluate_room_shared(database, session_id: str, room_id: str) -> dict:
+    key = (session_id, room_id)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.get_running_loop().create_task(evaluate_room(database, session_id, room_id))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+def running_evaluation(session_id: str, room_id: str):
+    """ The room's evaluation task if one is running in this process. """
+    return _inflight.get((session_id, room_id))
+
+def running_count() -> int:
+    return len(_inflight)
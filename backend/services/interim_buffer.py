@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from pymongo import ReturnDocument
+from backend.config import settings
+from backend.database import async_db
+from backend.services.ai_agent import process_ai_turn
+from backend.services.transcript_hub import transcript_hub
+
+logger = logging.getLogger(__name__)
+
+
+async def persist_utterance(database, doc: dict, overwrite: bool = True):
+    """
+    Stores one finished utterance, pushes it to live subscribers and arms the
+    room's turn timer. With an utteranceId the row is an upsert keyed on it,
+    so a retried or re-sent final never duplicates the line; `overwrite=False`
+    (flushed interims) never replaces a row that is already there. A final
+    that replaces a flushed interim's text is pushed to subscribers as a
+    revision of that row, without arming another turn: the row gets
+    `revisedAt` and the room's transcriptRevision is bumped, so polling
+    clients see it too (ETag and `after`).
+    """
+    if doc.get("utteranceId"):
+        key = {"roomId": doc.get("roomId"), "speakerId": doc["speakerId"], "utteranceId": doc["utteranceId"]}
+        fields = {k: v for k, v in doc.items() if k != "_id"}
+        result = await database["transcripts"].update_one(
+            key,
+            {"$set" if overwrite else "$setOnInsert": fields},
+            upsert=True
+        )
+        if result.upserted_id is None:
+            if result.modified_count:
+                row = await database["transcripts"].find_one_and_update(
+                    key,
+                    {"$set": {"revisedAt": datetime.utcnow()}},
+                    return_document=ReturnDocument.AFTER
+                )
+                if doc.get("roomId"):
+                    await database["rooms"].update_one({"roomId": doc["roomId"]}, {"$inc": {"transcriptRevision": 1}})
+                if row is not None:
+                    transcript_hub.publish(row, revised=True)
+            return # Line already stored (and announced) for this utterance
+        doc["_id"] = result.upserted_id
+    else:
+        await database["transcripts"].insert_one(doc)
+
+    transcript_hub.publish(doc)
+    if doc.get("roomId"):
+        await database["rooms"].update_one(
+            {"roomId": doc["roomId"]},
+            {"$max": {"lastTranscriptAt": datetime.utcnow()}}
+        )
+    # Trigger AI analysis (arms / resets the room's turn timer)
+    if doc.get("roomId"):
+        process_ai_turn(doc["roomId"])
+
+
+class InterimBuffer:
+    """
+    Write-behind buffer for Web Speech interim results: one slot per speaker,
+    each interim replacing the last in memory. Nothing is written until the
+    final result arrives (which drops the slot). A slot with no final after
+    INTERIM_FLUSH_SECONDS is persisted as the utterance, so speech is not lost
+    when the recognizer never finalizes - but only when it carries an
+    utteranceId: the final may land on another worker, or after the flush,
+    and only the id lets it replace the flushed row instead of adding a
+    second one. Stale slots without an id are dropped.
+    """
+
+    def __init__(self):
+        self._pending = {} # (sessionId, roomId, speakerId) -> (doc, updated_at)
+        self._task = None
+        self.metrics = {"interim": 0, "coalesced": 0, "finals": 0, "flushed": 0, "dropped": 0, "errors": 0}
+
+    @staticmethod
+    def _key(doc: dict):
+        return doc["sessionId"], doc.get("roomId"), doc["speakerId"]
+
+    def put(self, doc: dict):
+        key = self._key(doc)
+        self.metrics["interim"] += 1
+        if key in self._pending:
+            self.metrics["coalesced"] += 1
+        self._pending[key] = (doc, time.monotonic())
+
+    def finalize(self, doc: dict):
+        """ The speaker's final result supersedes whatever interim is buffered. """
+        self.metrics["finals"] += 1
+        self._pending.pop(self._key(doc), None)
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(max_age=0)
+
+    async def flush(self, max_age: float = None):
+        """ Persists every slot with an utteranceId idle for longer than `max_age` seconds (drops the others). """
+        max_age = settings.INTERIM_FLUSH_SECONDS if max_age is None else max_age
+        now = time.monotonic()
+        stale = [key for key, (_, updated_at) in self._pending.items() if now - updated_at >= max_age]
+        if not stale:
+            return
+
+        database = async_db.get_db()
+        for key in stale:
+            # The slot may have been refreshed or finalized while we were writing
+            entry = self._pending.get(key)
+            if entry is None or now - entry[1] < max_age:
+                continue
+            doc, _ = self._pending.pop(key)
+            if not doc.get("utteranceId"):
+                self.metrics["dropped"] += 1
+                continue
+            try:
+                await persist_utterance(database, doc, overwrite=False)
+                self.metrics["flushed"] += 1
+            except Exception as e:
+                self.metrics["errors"] += 1
+                logger.error(f"Failed to flush interim transcript for {key}: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(1)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Interim flush failed: {e}")
+
+    def snapshot(self) -> dict:
+        return {**self.metrics, "buffered": len(self._pending)}
+
+
+interim_buffer = InterimBuffer()
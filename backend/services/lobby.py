@@ -0,0 +1,145 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from backend.config import settings
+from backend.gd_schemas import ParticipantModel, ParticipantRole, SessionModel, SessionStatus
+from backend.services import counters
+from backend.services.session_scheduler import session_scheduler
+
+# Lobby seats are a counter on the session document. A join claims one with a
+# single findOneAndUpdate guarded by `seats < cap`, so concurrent joins can
+# never overfill a session, and the same call upserts a fresh session when
+# every waiting one is full. New sessions are upserted on a deterministic
+# open slot, {lobby, slot} (unique): the join time's LOBBY_SLOT_SECONDS bucket
+# plus a counter, so a burst of joins that all miss fills one new session
+# instead of each inserting its own. A full slot turns the upsert into a
+# DuplicateKeyError, and the join moves on to the next counter.
+#
+# A student holds at most one seat: before touching any counter, a join
+# inserts the student's `lobby_seats` claim (unique on participantId). A
+# concurrent join by the same student loses that insert and returns the
+# session the winner was seated in instead of taking a second seat.
+#
+#   lobby_seats: {participantId, lobby, sessionId (None until seated), claimedAt}
+
+SEATS_COLLECTION = "lobby_seats"
+SEAT_CLAIM_TIMEOUT_SECONDS = 10 # A claim still unseated after this belongs to a request that died
+SEAT_CLAIM_POLL_SECONDS = 0.05
+
+SESSION_PROJECTION = {"_id": 0, "sessionId": 1, "startTime": 1}
+
+
+async def reserve_seat(database, participant_id: str, peer_id: str, name: str, lobby: str = "default") -> dict:
+    """
+    Seats a student in the earliest-starting waiting session with room left
+    (or a new one) and returns that session's {sessionId, startTime}.
+    Re-joins, concurrent or not, return the seat the student already holds.
+    """
+    while True:
+        claim = await database[SEATS_COLLECTION].find_one({"participantId": participant_id})
+        if claim is None:
+            try:
+                await database[SEATS_COLLECTION].insert_one({
+                    "participantId": participant_id,
+                    "lobby": lobby,
+                    "sessionId": None,
+                    "claimedAt": datetime.utcnow(),
+                })
+            except DuplicateKeyError:
+                continue # Another join by this student got there first: use its seat
+            try:
+                return await _take_seat(database, participant_id, peer_id, name, lobby)
+            except Exception:
+                await database[SEATS_COLLECTION].delete_one({"participantId": participant_id, "sessionId": None})
+                raise
+
+        if claim.get("sessionId") is None:
+            # The winning join is still being seated
+            if datetime.utcnow() - claim["claimedAt"] < timedelta(seconds=SEAT_CLAIM_TIMEOUT_SECONDS):
+                await asyncio.sleep(SEAT_CLAIM_POLL_SECONDS)
+                continue
+        else:
+            session = await database["sessions"].find_one(
+                {"sessionId": claim["sessionId"], "status": SessionStatus.WAITING.value},
+                SESSION_PROJECTION
+            )
+            if session is not None:
+                return session
+
+        # Stale claim (its session has started, or its request died): release it and join afresh
+        await database[SEATS_COLLECTION].delete_one({"_id": claim["_id"]})
+
+
+async def _take_seat(database, participant_id: str, peer_id: str, name: str, lobby: str) -> dict:
+    now = datetime.now(timezone.utc)
+    new_session = SessionModel(
+        sessionId=str(uuid.uuid4())[:8],
+        status=SessionStatus.WAITING,
+        startTime=now + timedelta(minutes=5)
+    ).model_dump(exclude={"status", "lobby", "seats", "slot"}) # set by the filter / $inc on insert
+
+    open_seat = {
+        "lobby": lobby,
+        "status": SessionStatus.WAITING.value,
+        "seats": {"$lt": settings.LOBBY_SEAT_CAP},
+        # Don't seat anyone in a session that is about to be allocated
+        "startTime": {"$gt": now + timedelta(seconds=settings.LOBBY_JOIN_CUTOFF_SECONDS)},
+    }
+    bucket = int(now.timestamp()) // settings.LOBBY_SLOT_SECONDS
+    counter = 0
+    while True:
+        # Earliest-starting session with room left
+        session = await database["sessions"].find_one_and_update(
+            open_seat,
+            {"$inc": {"seats": 1}},
+            projection=SESSION_PROJECTION,
+            sort=[("startTime", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if session is not None:
+            break
+        # None left: join (or open) this bucket's current slot
+        try:
+            session = await database["sessions"].find_one_and_update(
+                {**open_seat, "slot": f"{bucket}:{counter}"},
+                {"$inc": {"seats": 1}, "$setOnInsert": new_session},
+                projection=SESSION_PROJECTION,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            break
+        except DuplicateKeyError:
+            counter += 1 # Slot full (or closed to joins): try the next one
+
+    if session["sessionId"] == new_session["sessionId"]:
+        await counters.session_created(database)
+        session_scheduler.schedule(session["sessionId"], session["startTime"])
+
+    # Unique (sessionId, participantId): a leftover row from a join that died
+    # after seating means the seat is already counted, so hand this one back
+    participant = ParticipantModel(
+        participantId=participant_id,
+        sessionId=session["sessionId"],
+        peerId=peer_id,
+        name=name,
+        role=ParticipantRole.HUMAN
+    )
+    try:
+        result = await database["participants"].update_one(
+            {"sessionId": session["sessionId"], "participantId": participant_id},
+            {"$setOnInsert": participant.model_dump()},
+            upsert=True
+        )
+        inserted = result.upserted_id is not None
+    except DuplicateKeyError:
+        inserted = False
+    if not inserted:
+        await database["sessions"].update_one({"sessionId": session["sessionId"]}, {"$inc": {"seats": -1}})
+
+    await database[SEATS_COLLECTION].update_one(
+        {"participantId": participant_id},
+        {"$set": {"sessionId": session["sessionId"]}}
+    )
+    return session
@@ -0,0 +1,49 @@
+import asyncio
+
+
+class LobbyEvents:
+    """
+    In-process wake-ups for lobby streams: when a session starts or its rooms
+    are allocated, every stream waiting on that session re-reads its state
+    right away instead of at its next periodic check.
+    """
+
+    def __init__(self):
+        self._waiters = {} # session_id -> set of asyncio.Event
+        self._loop = None
+
+    def subscribe(self, session_id: str) -> asyncio.Event:
+        self._loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        self._waiters.setdefault(session_id, set()).add(event)
+        return event
+
+    def unsubscribe(self, session_id: str, event: asyncio.Event):
+        waiters = self._waiters.get(session_id)
+        if waiters is not None:
+            waiters.discard(event)
+            if not waiters:
+                del self._waiters[session_id]
+
+    def notify(self, session_id: str):
+        """ Safe to call from worker threads (allocation). """
+        if session_id not in self._waiters or self._loop is None:
+            return
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        if current is self._loop:
+            self._wake(session_id)
+        else:
+            self._loop.call_soon_threadsafe(self._wake, session_id)
+
+    def _wake(self, session_id: str):
+        for event in self._waiters.get(session_id, ()):
+            event.set()
+
+    def waiter_count(self) -> int:
+        return sum(len(w) for w in self._waiters.values())
+
+
+lobby_events = LobbyEvents()
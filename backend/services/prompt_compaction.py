@@ -0,0 +1,138 @@
+import re
+
+# Compact GD transcripts for evaluation prompts. Interim fragments are
+# deduped, consecutive lines from one speaker are merged, and every line from a
+# student being evaluated is kept. Other speakers (bots, unlabelled humans) are
+# truncated and, past the token budget, dropped - lines a student answered
+# right after are kept longest.
+
+# Local tokenizer approximation: words in chunks of up to 4 characters plus
+# each punctuation mark, which tracks BPE counts for English closely enough
+# for budgeting without shipping a tokenizer.
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+def speaker_prefix(speaker: str, labels: dict) -> str:
+    if speaker in labels:
+        return labels[speaker]
+    if speaker.startswith("ai-"):
+        return "AI_Participant"
+    return "Student"
+
+
+def _extends(longer: str, shorter: str) -> bool:
+    """ Whether `longer` is `shorter` plus more words ("No" does not extend to "Nobody"). """
+    if not longer.startswith(shorter):
+        return False
+    return len(longer) == len(shorter) or not (shorter[-1].isalnum() and longer[len(shorter)].isalnum())
+
+
+def _dedupe(transcripts: list) -> list:
+    """
+    (speaker, text) per utterance. A row repeating the speaker's previous line,
+    or a fragment of it ending on a word boundary, is dropped; a row extending
+    it (the interim grew) replaces it. Rows sharing an utteranceId keep the
+    last text.
+    """
+    lines = []
+    utterances = {} # (speaker, utteranceId) -> index in lines
+    for t in transcripts:
+        text = " ".join((t.get("text") or "").split())
+        if not text:
+            continue
+        speaker = t["speakerId"]
+
+        key = (speaker, t.get("utteranceId"))
+        if key[1] and key in utterances:
+            lines[utterances[key]] = (speaker, text)
+            continue
+
+        if lines and lines[-1][0] == speaker:
+            previous = lines[-1][1].lower()
+            if _extends(text.lower(), previous):
+                lines[-1] = (speaker, text)
+                continue
+            if _extends(previous, text.lower()):
+                continue
+
+        if key[1]:
+            utterances[key] = len(lines)
+        lines.append((speaker, text))
+    return lines
+
+
+def _merge(lines: list) -> list:
+    merged = []
+    for speaker, text in lines:
+        if merged and merged[-1][0] == speaker:
+            merged[-1] = (speaker, f"{merged[-1][1]} {text}")
+        else:
+            merged.append((speaker, text))
+    return merged
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept, used = [], 0
+    for word in text.split():
+        used += estimate_tokens(word)
+        if used > max_tokens:
+            break
+        kept.append(word)
+    return " ".join(kept) + " ..."
+
+
+def compact_conversation(transcripts: list, labels: dict, budget: int, line_tokens: int):
+    """
+    Prompt text for `transcripts` within roughly `budget` tokens, plus stats.
+    Lines of speakers in `labels` are always kept in full, so a room whose
+    students alone exceed the budget goes over it. Other lines are cut to
+    `line_tokens` each and then dropped, oldest first except those a student
+    replied to; each dropped run becomes a one-line marker.
+    """
+    lines = _merge(_dedupe(transcripts))
+    rendered = []
+    for speaker, text in lines:
+        if speaker not in labels:
+            text = _truncate(text, line_tokens)
+        rendered.append(f"{speaker_prefix(speaker, labels)}: {text}")
+    costs = [estimate_tokens(line) for line in rendered]
+
+    keep = [lines[i][0] in labels for i in range(len(lines))]
+    remaining = budget - sum(cost for cost, kept in zip(costs, keep) if kept)
+    others = [i for i in range(len(lines)) if not keep[i]]
+    # Lines followed by a student's answer first, then newest first
+    others.sort(key=lambda i: (not (i + 1 < len(lines) and keep[i + 1]), -i))
+    for i in others:
+        if costs[i] <= remaining:
+            keep[i] = True
+            remaining -= costs[i]
+
+    out, dropped = [], 0
+    for i, line in enumerate(rendered):
+        if keep[i]:
+            if dropped:
+                out.append(f"[{dropped} lines from other participants omitted]")
+                dropped = 0
+            out.append(line)
+        else:
+            dropped += 1
+    if dropped:
+        out.append(f"[{dropped} lines from other participants omitted]")
+
+    text = "\n".join(out) + "\n"
+    raw_tokens = sum(estimate_tokens(f"{speaker_prefix(t['speakerId'], labels)}: {t.get('text') or ''}") for t in transcripts)
+    prompt_tokens = estimate_tokens(text)
+    stats = {
+        "lines_in": len(transcripts),
+        "lines_out": len(out),
+        "raw_tokens": raw_tokens,
+        "prompt_tokens": prompt_tokens,
+        "tokens_saved": max(0, raw_tokens - prompt_tokens),
+    }
+    return text, stats
@@ -0,0 +1,50 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from backend.config import settings
+
+# Short-lived lease stored on the room document, so only one worker process
+# (uvicorn/gunicorn worker or serverless instance) runs a room's turn at a time.
+# Leases expire on their own, so a crashed holder only blocks the room for
+# AI_TURN_LEASE_SECONDS.
+
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def acquire_turn_lease(database, room_id: str, projection: dict = None):
+    """
+    Atomically takes the room's turn lease if it is free or expired.
+    Returns (owner_token, room) - the room shaped by `projection` - or None when
+    another holder owns an unexpired lease (or the room does not exist).
+    """
+    now = datetime.utcnow()
+    owner = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+
+    room = await database["rooms"].find_one_and_update(
+        {
+            "roomId": room_id,
+            "$or": [
+                {"turnLease": None},
+                {"turnLease.expiresAt": {"$lte": now}},
+            ],
+        },
+        {"$set": {"turnLease": {
+            "owner": owner,
+            "expiresAt": now + timedelta(seconds=settings.AI_TURN_LEASE_SECONDS),
+        }}},
+        projection=projection,
+        return_document=ReturnDocument.AFTER
+    )
+    if room is None:
+        return None
+    return owner, room
+
+
+async def release_turn_lease(database, room_id: str, owner: str):
+    """ Releases the lease only if we still hold it (it may have expired and moved on). """
+    await database["rooms"].update_one(
+        {"roomId": room_id, "turnLease.owner": owner},
+        {"$unset": {"turnLease": ""}}
+    )
@@ -0,0 +1,100 @@
+from pymongo import ReplaceOne
+from backend.services import counters
+
+# Unified, append-only copy of every result row, one query per dashboard load.
+# Each ledger row reuses the `_id` of its source document, so write-through and
+# backfill are idempotent and the ids the frontend sees do not change.
+LEDGER_COLLECTION = "score_ledger"
+
+ROUND_TYPE_BY_COLLECTION = {
+    "student_scores": None, # Generic fallback, keeps whatever round_type it was saved with
+    "mock_placement_results": "mock_placement",
+    "tech_prep_results": "tech_prep",
+    "aptitude_results": "aptitude",
+    "gd_results": "gd",
+    "technical_interview_results": "technical_interview",
+    "ai_interview_results": "ai_interview",
+}
+
+def collection_for_round(round_type: str) -> str:
+    """ Maps a score's round_type to the per-round collection it is stored in. """
+    round_type = (round_type or "").strip().lower()
+
+    if round_type == 'technical_interview':
+        return "technical_interview_results"
+    elif round_type == 'mock_placement':
+        return "mock_placement_results"
+    elif round_type == 'tech_prep':
+        return "tech_prep_results"
+    elif round_type in ['aptitude', 'tech_aptitude']:
+        return "aptitude_results"
+    elif round_type == 'ai_interview':
+        return "ai_interview_results"
+    elif round_type == 'gd':
+        return "gd_results"
+    return "student_scores"
+
+def normalize_round_type(round_type: str):
+    """
+    The ledger's spelling of a round_type: lowercase, with aliases folded onto
+    the round of the collection they are stored in (tech_aptitude -> aptitude).
+    None for an empty value.
+    """
+    round_type = (round_type or "").strip().lower()
+    return ROUND_TYPE_BY_COLLECTION[collection_for_round(round_type)] or round_type or None
+
+def ledger_entry(doc: dict, collection_name: str) -> dict:
+    """ Builds the ledger row for a document already stored in `collection_name`. """
+    entry = dict(doc)
+    entry["round_type"] = normalize_round_type(entry.get("round_type")) or ROUND_TYPE_BY_COLLECTION.get(collection_name)
+    entry["source_collection"] = collection_name
+    return entry
+
+async def record_score(database, doc: dict, collection_name: str):
+    """
+    Inserts a result into its per-round collection and writes it through to
+    the ledger. Returns the inserted id.
+    """
+    result = await database[collection_name].insert_one(doc)
+    # insert_one sets doc["_id"], so the ledger row shares the source id
+    entry = ledger_entry(doc, collection_name)
+    try:
+        await database[LEDGER_COLLECTION].insert_one(entry)
+        await counters.result_recorded(database, entry["round_type"])
+    except Exception as e:
+        # The source row is saved; backfill_score_ledger.py will pick it up
+        print(f"[ScoreLedger] Write-through failed for {collection_name}/{result.inserted_id}: {e}")
+    return result.inserted_id
+
+async def record_scores(database, docs: list, collection_name: str):
+    """ Batch `record_score`: one insert_many per collection. Returns the inserted ids. """
+    if not docs:
+        return []
+    result = await database[collection_name].insert_many(docs)
+    entries = [ledger_entry(doc, collection_name) for doc in docs]
+    try:
+        await database[LEDGER_COLLECTION].insert_many(entries, ordered=False)
+        await counters.result_recorded(database, entries[0]["round_type"], count=len(entries))
+    except Exception as e:
+        print(f"[ScoreLedger] Write-through failed for {len(docs)} {collection_name} rows: {e}")
+    return result.inserted_ids
+
+def backfill_ledger(database, batch_size: int = 500) -> dict:
+    """
+    Copies every existing per-round result into the ledger (sync pymongo).
+    Upserts by `_id`, so it is safe to re-run after a partial failure.
+    """
+    counts = {}
+    for col_name in ROUND_TYPE_BY_COLLECTION:
+        ops = []
+        counts[col_name] = 0
+        for doc in database[col_name].find({}):
+            ops.append(ReplaceOne({"_id": doc["_id"]}, ledger_entry(doc, col_name), upsert=True))
+            if len(ops) >= batch_size:
+                database[LEDGER_COLLECTION].bulk_write(ops, ordered=False)
+                counts[col_name] += len(ops)
+                ops = []
+        if ops:
+            database[LEDGER_COLLECTION].bulk_write(ops, ordered=False)
+            counts[col_name] += len(ops)
+    return counts
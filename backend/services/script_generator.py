@@ -16,16 +16,8 @@ if settings.AI_API_KEYS:
         except Exception as e:
             logger.error(f"Failed to init Groq client key: {e}")
 
-def generate_topic_script(topic: str, num_turns: int = 15) -> list:
-    """
-    Generates a debate script with diverse perspectives (For, Against, Neutral)
-    Returns a list of dicts: [{"sentiment": "For", "text": "..."}]
-    """
-    if not clients:
-        logger.error("No AI clients available for script generation.")
-        return []
-
-    system_prompt = (
+def _script_prompt(topic: str, num_turns: int) -> str:
+    return (
         "You are an expert debate script writer. "
         f"Generate a realistic Group Discussion script on the topic: '{topic}'. "
         f"Create exactly {num_turns} turns. "
@@ -36,6 +28,17 @@ def generate_topic_script(topic: str, num_turns: int = 15) -> list:
         "Example: [{'sentiment': 'For', 'text': 'I believe...'}, {'sentiment': 'Against', 'text': 'But consider...'}]"
     )
 
+def generate_topic_script(topic: str, num_turns: int = 15) -> list:
+    """
+    Generates a debate script with diverse perspectives (For, Against, Neutral)
+    Returns a list of dicts: [{"sentiment": "For", "text": "..."}]
+    """
+    if not clients:
+        logger.error("No AI clients available for script generation.")
+        return []
+
+    system_prompt = _script_prompt(topic, num_turns)
+
     # Retry Logic with Rotation
     attempts = 0
     max_attempts = len(clients)
@@ -85,3 +88,91 @@ def generate_topic_script(topic: str, num_turns: int = 15) -> list:
             
     print("Failed to generate script after rotations.")
     return []
+
+
+class TurnStreamParser:
+    """
+    Pulls complete turn objects ({"sentiment", "text"}) out of a JSON script
+    while it is still streaming in, whether the model emits a bare array or
+    wraps it in an object.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._starts = [] # offsets of the currently open '{'
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> list:
+        self._text += chunk
+        turns = []
+        text = self._text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._starts.append(i)
+            elif ch == "}" and self._starts:
+                start = self._starts.pop()
+                try:
+                    obj = json.loads(text[start:i + 1])
+                except ValueError:
+                    continue
+                if isinstance(obj, dict) and "text" in obj:
+                    turns.append(obj)
+        self._pos = len(text)
+        return turns
+
+def stream_topic_script(topic: str, num_turns: int = 15):
+    """
+    Streaming variant of `generate_topic_script`: yields each turn dict as soon
+    as the model has finished writing it. Rotates clients only until the first
+    turn arrives; a stream that breaks later just ends early.
+    (JSON mode cannot be streamed, so the format comes from the prompt alone.)
+    """
+    if not clients:
+        logger.error("No AI clients available for script generation.")
+        return
+
+    start_idx = random.randint(0, len(clients) - 1)
+    for attempt in range(max(len(clients), 3)):
+        client_idx = (start_idx + attempt) % len(clients)
+        parser = TurnStreamParser()
+        yielded = 0
+        try:
+            print(f"Streaming script for '{topic}' using client {client_idx}...")
+            stream = clients[client_idx].chat.completions.create(
+                messages=[
+                    {"role": "system", "content": _script_prompt(topic, num_turns) + " Use standard double-quoted JSON and output nothing else."},
+                    {"role": "user", "content": f"Topic: {topic}"}
+                ],
+                model="llama-3.3-70b-versatile",
+                temperature=0.7,
+                stream=True
+            )
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                for turn in parser.feed(delta):
+                    yielded += 1
+                    yield turn
+            if yielded:
+                logger.info(f"Streamed {yielded} turns for topic {topic}")
+                return
+            print("Stream finished without any turns. Retrying...")
+        except Exception as e:
+            print(f"Script Streaming Error (Client {client_idx}): {e}")
+            if yielded:
+                return
+
+    print("Failed to stream script after rotations.")
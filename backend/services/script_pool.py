@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import random
+import threading
+import uuid
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from backend.config import settings
+from backend.constants import GD_TOPICS
+from backend.database import async_db
+from backend.services.room_lease import WORKER_ID
+from backend.services.script_generator import generate_topic_script
+
+logger = logging.getLogger(__name__)
+
+# Pre-generated GD scripts, SCRIPT_POOL_SIZE per topic, so allocation claims a
+# ready script (one findOneAndDelete) instead of waiting on a 70B completion.
+# A background task tops the pool back up; on-demand generation only runs
+# when a topic's pool is empty, and concurrent misses share one call.
+# Every worker runs the replenisher, but a lease in `script_pool_lease` lets
+# only one of them refill at a time.
+
+SCRIPT_POOL_COLLECTION = "script_pool"
+SCRIPT_POOL_LEASE_COLLECTION = "script_pool_lease"
+SENTIMENTS = {"For", "Against", "Neutral"}
+
+
+def validate_script(script, min_turns: int = None):
+    """
+    Returns the script cleaned to [{"sentiment", "text"}] turns, or None when
+    it is not usable (wrong shape or fewer than `min_turns` turns).
+    """
+    min_turns = settings.SCRIPT_MIN_TURNS if min_turns is None else min_turns
+    if not isinstance(script, list):
+        return None
+
+    cleaned = []
+    for turn in script:
+        if not isinstance(turn, dict):
+            continue
+        text = turn.get("text")
+        if not isinstance(text, str) or not text.strip():
+            continue
+        sentiment = turn.get("sentiment")
+        cleaned.append({
+            "sentiment": sentiment if sentiment in SENTIMENTS else "Neutral",
+            "text": text.strip()
+        })
+
+    return cleaned if len(cleaned) >= min_turns else None
+
+
+class ScriptPool:
+    def __init__(self):
+        self._inflight = {} # topic -> Future of the shared generation call
+        self._lock = threading.Lock()
+        self._loop = None
+        self._task = None
+        self._wakeup = None
+        self._owner = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+        self.metrics = {"claimed": 0, "misses": 0, "generated": 0, "shared": 0, "rejected": 0, "errors": 0, "lease_skipped": 0}
+
+    # --- Single-flight generation (any thread) ---
+
+    def generate(self, topic: str) -> list:
+        """ Generates a script for `topic`; callers that arrive while one is in flight share its result. """
+        with self._lock:
+            future = self._inflight.get(topic)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[topic] = future
+            else:
+                self.metrics["shared"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            script = generate_topic_script(topic)
+            self.metrics["generated"] += 1
+            future.set_result(script)
+            return script
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(topic, None)
+
+    # --- Allocation path (sync pymongo, worker threads) ---
+
+    def claim(self, database, topic: str = None, on_demand: bool = True):
+        """
+        Returns (topic, script) for a new room: a pooled script for `topic` (random
+        if None), else a pooled script for any topic, else one generated on demand
+        - or (topic, None) on a miss when `on_demand` is False (caller streams it).
+        """
+        topic = topic or random.choice(GD_TOPICS)
+        pool = database[SCRIPT_POOL_COLLECTION]
+
+        doc = pool.find_one_and_delete({"topic": topic}, sort=[("created_at", 1)])
+        if doc is None:
+            doc = pool.find_one_and_delete({}, sort=[("created_at", 1)])
+
+        self.wake()
+        if doc is not None:
+            self.metrics["claimed"] += 1
+            return doc["topic"], doc["script"]
+
+        self.metrics["misses"] += 1
+        if not on_demand:
+            return topic, None
+        print(f"[ScriptPool] Pool empty, generating script for topic '{topic}' on demand...")
+        script = self.generate(topic)
+        return topic, validate_script(script, min_turns=0) or []
+
+    # --- Replenisher (event loop) ---
+
+    def start(self):
+        if not settings.SCRIPT_POOL_ENABLED or (self._task is not None and not self._task.done()):
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """ Asks the replenisher to top up now, e.g. right after a claim. Thread-safe. """
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def levels(self) -> dict:
+        database = async_db.get_db()
+        cursor = await database[SCRIPT_POOL_COLLECTION].aggregate([
+            {"$group": {"_id": "$topic", "count": {"$sum": 1}}}
+        ])
+        counts = {row["_id"]: row["count"] async for row in cursor}
+        return {topic: counts.get(topic, 0) for topic in GD_TOPICS}
+
+    async def _hold_lease(self, database) -> bool:
+        """ Takes (or renews) the replenisher lease; False while another worker holds it. """
+        now = datetime.utcnow()
+        try:
+            await database[SCRIPT_POOL_LEASE_COLLECTION].update_one(
+                {
+                    "_id": "replenisher",
+                    "$or": [{"owner": self._owner}, {"expiresAt": {"$lte": now}}],
+                },
+                {"$set": {
+                    "owner": self._owner,
+                    "expiresAt": now + timedelta(seconds=settings.SCRIPT_POOL_LEASE_SECONDS),
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False # The lease document exists and is held by someone else
+        return True
+
+    async def _release_lease(self, database):
+        await database[SCRIPT_POOL_LEASE_COLLECTION].delete_one({"_id": "replenisher", "owner": self._owner})
+
+    async def replenish(self):
+        """
+        Generates scripts for every topic below SCRIPT_POOL_SIZE, a few topics
+        at a time, while holding the replenisher lease. Levels are read after
+        taking it, so a refill never stacks on top of another worker's.
+        """
+        database = async_db.get_db()
+        if not await self._hold_lease(database):
+            self.metrics["lease_skipped"] += 1
+            return
+        try:
+            await self._fill(database)
+        finally:
+            await self._release_lease(database)
+
+    async def _fill(self, database):
+        levels = await self.levels()
+        semaphore = asyncio.Semaphore(settings.SCRIPT_POOL_CONCURRENCY)
+
+        async def fill(topic: str, missing: int):
+            async with semaphore:
+                for _ in range(missing):
+                    if not await self._hold_lease(database):
+                        return # Lease lost (e.g. a stalled event loop): leave the rest to its new holder
+                    # Not the single-flight path: a script shared with a waiting room must never also be pooled
+                    script = validate_script(await asyncio.to_thread(generate_topic_script, topic))
+                    self.metrics["generated"] += 1
+                    if script is None:
+                        self.metrics["rejected"] += 1
+                        continue
+                    await database[SCRIPT_POOL_COLLECTION].insert_one({
+                        "topic": topic,
+                        "script": script,
+                        "turns": len(script),
+                        "created_at": datetime.utcnow()
+                    })
+
+        await asyncio.gather(*(
+            fill(topic, settings.SCRIPT_POOL_SIZE - count)
+            for topic, count in levels.items()
+            if count < settings.SCRIPT_POOL_SIZE
+        ))
+
+    async def _run(self):
+        while True:
+            try:
+                await self.replenish()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics["errors"] += 1
+                logger.error(f"Script pool replenish failed: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.SCRIPT_POOL_REFILL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def snapshot(self) -> dict:
+        return {**self.metrics, "in_flight": len(self._inflight), "target_per_topic": settings.SCRIPT_POOL_SIZE}
+
+
+script_pool = ScriptPool()
@@ -0,0 +1,137 @@
+import logging
+import threading
+from datetime import datetime
+from backend.services.script_generator import stream_topic_script
+from backend.services.script_pool import validate_script
+
+logger = logging.getLogger(__name__)
+
+
+class ScriptStream:
+    """
+    A topic's script, streamed from the model in a background thread.
+    Allocation waits for the first few turns only, inserts the room with them
+    (scriptComplete: False), then `attach`es the stream so every later turn is
+    $push-ed onto rooms.script as it arrives. The last push flips
+    scriptComplete, which tells the turn logic the frontier is final. Each
+    push stamps scriptStreamedAt; the turn logic closes a script whose stream
+    stalls, and pushes stop once the room's script is complete.
+    Rooms allocated while a topic's stream is running share it (see
+    `shared_stream`), so several rooms can be attached to one stream.
+    """
+
+    def __init__(self, topic: str, num_turns: int = 15):
+        self.topic = topic
+        self.num_turns = num_turns
+        self._turns = []
+        self._done = False
+        self._cancelled = False
+        self._cond = threading.Condition()
+        self._push_lock = threading.Lock()
+        self._subscribers = 0 # rooms waiting on or attached to this stream
+        self._rooms = {} # room_id -> [database, turns pushed] once inserted
+
+    def start(self):
+        threading.Thread(target=self._run, name=f"script-stream-{self.topic[:20]}", daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            for turn in stream_topic_script(self.topic, self.num_turns):
+                if self._cancelled:
+                    break # Leaving the loop closes the model stream
+                cleaned = validate_script([turn], min_turns=1)
+                if not cleaned:
+                    continue
+                with self._cond:
+                    self._turns.extend(cleaned)
+                    self._cond.notify_all()
+                self._push()
+        except Exception as e:
+            logger.error(f"Script stream for '{self.topic}' failed: {e}")
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+            with _lock:
+                if _inflight.get(self.topic) is self:
+                    _inflight.pop(self.topic)
+            self._push()
+
+    def first_turns(self, count: int, timeout: float) -> list:
+        """ Blocks until `count` turns exist (or the stream ends / times out) and returns them. """
+        with self._cond:
+            self._cond.wait_for(lambda: self._done or len(self._turns) >= count, timeout)
+            return list(self._turns)
+
+    def subscribe(self) -> bool:
+        """ Registers one more room on the stream; False once it has been cancelled. """
+        with self._cond:
+            if self._cancelled:
+                return False
+            self._subscribers += 1
+            return True
+
+    def cancel(self):
+        """ Drops a room that was never inserted; generation stops when no room is left. """
+        with self._cond:
+            self._subscribers -= 1
+            if self._subscribers <= 0:
+                self._cancelled = True
+
+    def attach(self, database, room_id: str, sent: int):
+        """ Starts appending to the inserted room; `sent` turns are already in its script. """
+        with self._push_lock:
+            self._rooms[room_id] = [database, sent]
+        self._push()
+
+    def _push(self):
+        with self._push_lock:
+            with self._cond:
+                turns = list(self._turns)
+                done = self._done
+
+            for room_id, room in list(self._rooms.items()):
+                database, pushed = room
+                new_turns = turns[pushed:]
+                if not new_turns and not done:
+                    continue
+                update = {"$set": {"scriptStreamedAt": datetime.utcnow()}}
+                if new_turns:
+                    update["$push"] = {"script": {"$each": new_turns}}
+                if done:
+                    update["$set"]["scriptComplete"] = True
+
+                try:
+                    database["rooms"].update_one({"roomId": room_id, "scriptComplete": False}, update)
+                except Exception as e:
+                    logger.error(f"Failed to append script turns to room {room_id}: {e}")
+                    continue
+                room[1] += len(new_turns)
+                if done:
+                    self._rooms.pop(room_id)
+
+
+# Single-flight per topic: topic -> the ScriptStream currently generating it
+_inflight = {}
+_lock = threading.Lock()
+
+
+def shared_stream(topic: str) -> ScriptStream:
+    """
+    Subscribes a new room to the running stream for `topic`, starting one if
+    there is none, so concurrent pool misses on a topic open one model stream.
+    Every caller must later `attach` or `cancel` exactly once.
+    """
+    with _lock:
+        stream = _inflight.get(topic)
+        if stream is None or not stream.subscribe():
+            stream = ScriptStream(topic)
+            stream.subscribe()
+            _inflight[topic] = stream
+            stream.start()
+    return stream
+
+
+def in_flight() -> int:
+    return len(_inflight)
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from backend.config import settings
+from backend.database import async_db
+from backend.gd_schemas import SessionStatus
+from backend.services import counters
+from backend.services.allocation_jobs import enqueue as enqueue_allocation
+from backend.services.lobby_events import lobby_events
+from backend.services.turn_scheduler import TurnScheduler
+
+logger = logging.getLogger(__name__)
+
+
+def as_utc(value):
+    """ Session times are datetimes (naive = UTC), or ISO strings on older rows. """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value if isinstance(value, datetime) else None
+
+
+async def start_session(session_id: str) -> bool:
+    """
+    Flips a due session to active and queues its room allocation job. The
+    flip is a conditional update, so when several workers hold the same
+    timer only one of them enqueues (and enqueueing is idempotent anyway).
+    Returns True if this call started it.
+    """
+    database = async_db.get_db()
+    now = datetime.now(timezone.utc)
+    result = await database["sessions"].update_one(
+        {
+            "sessionId": session_id,
+            "status": SessionStatus.WAITING.value,
+            "startTime": {"$lte": now + timedelta(seconds=1)},
+        },
+        {"$set": {"status": SessionStatus.ACTIVE.value, "startedAt": now}}
+    )
+    if result.modified_count == 0:
+        return False # Already started elsewhere (or not due; the next resync re-arms it)
+
+    await counters.session_transition(database, SessionStatus.WAITING, SessionStatus.ACTIVE)
+    lobby_events.notify(session_id)
+    print(f"[Scheduler] Session {session_id} started, queueing room allocation...")
+    await enqueue_allocation(database, session_id)
+    return True
+
+
+async def start_if_due(database, session_id: str, status: str, start_time) -> str:
+    """
+    Request-path fallback (REQUEST_PATH_FALLBACK) for deployments where the
+    start timer may not run: flips an overdue waiting session to active.
+    The flip is conditional, so racing the scheduler is safe; allocation is
+    still left to the job worker. Returns the session's current status.
+    """
+    if not settings.REQUEST_PATH_FALLBACK or status != SessionStatus.WAITING.value:
+        return status
+    start_time = as_utc(start_time)
+    if start_time is None or start_time > datetime.now(timezone.utc):
+        return status
+    if await start_session(session_id):
+        return SessionStatus.ACTIVE.value
+    session = await database["sessions"].find_one({"sessionId": session_id}, {"_id": 0, "status": 1})
+    return session["status"] if session else status
+
+
+class SessionStartScheduler:
+    """
+    Starts GD sessions exactly at their startTime. Upcoming starts sit in a
+    heap timer (the same one that paces bot turns); waiting sessions are
+    re-read from Mongo at startup and every SESSION_RESYNC_SECONDS, which
+    covers restarts and sessions created by other workers.
+    """
+
+    def __init__(self):
+        self._timers = TurnScheduler(start_session, delay=0)
+        self._resync = None
+
+    def start(self):
+        self._timers.start()
+        if self._resync is None:
+            self._resync = asyncio.get_running_loop().create_task(self._resync_loop())
+
+    async def stop(self):
+        if self._resync is not None:
+            self._resync.cancel()
+            try:
+                await self._resync
+            except asyncio.CancelledError:
+                pass
+            self._resync = None
+        await self._timers.stop()
+
+    def schedule(self, session_id: str, start_time, reset: bool = True):
+        """ Arms the session's start timer (overdue sessions fire right away). Thread-safe. """
+        start_time = as_utc(start_time)
+        if start_time is None:
+            return
+        delay = max(0.0, (start_time - datetime.now(timezone.utc)).total_seconds())
+        self._timers.schedule(session_id, reset=reset, delay=delay)
+
+    async def recover(self) -> int:
+        """ Arms a timer for every waiting session; already pending ones are left alone. """
+        database = async_db.get_db()
+        sessions = await database["sessions"].find(
+            {"status": SessionStatus.WAITING.value},
+            {"_id": 0, "sessionId": 1, "startTime": 1}
+        ).to_list()
+        for session in sessions:
+            self.schedule(session["sessionId"], session.get("startTime"), reset=False)
+        return len(sessions)
+
+    async def _resync_loop(self):
+        while True:
+            try:
+                await self.recover()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Session scheduler resync failed: {e}")
+            await asyncio.sleep(settings.SESSION_RESYNC_SECONDS)
+
+    def snapshot(self) -> dict:
+        return self._timers.snapshot()
+
+
+session_scheduler = SessionStartScheduler()
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from backend.config import settings
+from backend.database import async_db
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptHub:
+    """
+    In-process fan-out of new transcript rows to live room subscribers (SSE).
+
+    Rows reach the hub one of two ways:
+      - writers call `publish` right after their insert (single worker), or
+      - with TRANSCRIPT_CHANGE_STREAM on, one change stream per worker feeds it,
+        so lines inserted by any worker or instance reach every subscriber.
+
+    It also remembers each room's newest row (id + timestamp) and transcript
+    revision (bumped when a row's text is replaced), which the polling
+    endpoint uses for its ETag and the silence breaker. That cache is an LRU
+    capped at TRANSCRIPT_ACTIVITY_CACHE_SIZE rooms; without a change stream,
+    entries past their trust window are also evicted as new ones arrive.
+    """
+
+    def __init__(self, queue_size: int = 1000):
+        self._queue_size = queue_size
+        self._rooms = {} # room_id -> set of asyncio.Queue
+        self._activity = OrderedDict() # room_id -> (last_id, timestamp, revision, noted_at), oldest first
+        self._loop = None
+        self._watcher = None
+
+    def subscribe(self, room_id: str) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self._queue_size)
+        self._rooms.setdefault(room_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, room_id: str, queue: asyncio.Queue):
+        subscribers = self._rooms.get(room_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._rooms[room_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(s) for s in self._rooms.values())
+
+    # --- Room activity cache ---
+
+    def note_activity(self, room_id: str, last_id, timestamp, revision: int = None):
+        """ Records the room's newest row; `revision` None keeps the one already cached. """
+        if not room_id:
+            return
+        now = time.monotonic()
+        if revision is None:
+            revision = self._activity.get(room_id, (None, None, None))[2]
+        self._activity[room_id] = (last_id, timestamp, revision, now)
+        self._activity.move_to_end(room_id)
+
+        while len(self._activity) > settings.TRANSCRIPT_ACTIVITY_CACHE_SIZE:
+            self._activity.popitem(last=False)
+        if not settings.TRANSCRIPT_CHANGE_STREAM:
+            while now - next(iter(self._activity.values()))[3] > settings.TRANSCRIPT_ACTIVITY_CACHE_SECONDS:
+                self._activity.popitem(last=False)
+
+    def note_revision(self, room_id: str):
+        """ A row's text was replaced: forget the cached tail so the next read picks up the new revision. """
+        self._activity.pop(room_id, None)
+
+    def last_activity(self, room_id: str):
+        """
+        Returns (last_id, timestamp, revision) of the room's newest row, or None
+        when unknown or too old to trust (another worker may have written since).
+        `revision` is None when only the tail is known.
+        """
+        entry = self._activity.get(room_id)
+        if entry is None:
+            return None
+        if not settings.TRANSCRIPT_CHANGE_STREAM and time.monotonic() - entry[3] > settings.TRANSCRIPT_ACTIVITY_CACHE_SECONDS:
+            del self._activity[room_id]
+            return None
+        return entry[:3]
+
+    # --- Fan-out ---
+
+    def publish(self, doc: dict, revised: bool = False):
+        """
+        Called by writers after inserting a transcript row, or with `revised`
+        after replacing an existing row's text; no-op fan-out when the change
+        stream feeds the hub.
+        """
+        if revised:
+            self.note_revision(doc.get("roomId"))
+        else:
+            self.note_activity(doc.get("roomId"), doc.get("_id"), doc.get("timestamp"))
+        if settings.TRANSCRIPT_CHANGE_STREAM:
+            return
+        if revised:
+            self._dispatch({**doc, "revised": True})
+        else:
+            self._dispatch(doc)
+
+    def _dispatch(self, doc: dict):
+        room_id = doc.get("roomId")
+        if not room_id or room_id not in self._rooms or self._loop is None:
+            return
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        if current is self._loop:
+            self._deliver(room_id, doc)
+        else:
+            # e.g. allocation's greeting, written from a worker thread
+            self._loop.call_soon_threadsafe(self._deliver, room_id, doc)
+
+    def _deliver(self, room_id: str, doc: dict):
+        for queue in list(self._rooms.get(room_id, ())):
+            try:
+                queue.put_nowait(doc)
+            except asyncio.QueueFull:
+                # Slow consumer: end its stream, the client resumes with Last-Event-ID
+                self.unsubscribe(room_id, queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    # --- Optional change stream feeder ---
+
+    def start(self):
+        if settings.TRANSCRIPT_CHANGE_STREAM and self._watcher is None:
+            self._loop = asyncio.get_running_loop()
+            self._watcher = self._loop.create_task(self._watch())
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    async def _watch(self):
+        resume_token = None
+        while True:
+            try:
+                collection = async_db.get_db()["transcripts"]
+                # Updates are finals replacing a flushed interim's text
+                pipeline = [{"$match": {"operationType": {"$in": ["insert", "update"]}}}]
+                async with await collection.watch(pipeline, resume_after=resume_token, full_document="updateLookup") as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        doc = change.get("fullDocument")
+                        if doc is None:
+                            continue # Row deleted before the lookup
+                        if change["operationType"] == "update":
+                            self.note_revision(doc.get("roomId"))
+                            self._dispatch({**doc, "revised": True})
+                            continue
+                        self.note_activity(doc.get("roomId"), doc["_id"], doc.get("timestamp"))
+                        self._dispatch(doc)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Transcript change stream failed, retrying: {e}")
+                await asyncio.sleep(2)
+
+
+transcript_hub = TranscriptHub()
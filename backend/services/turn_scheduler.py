@@ -0,0 +1,136 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TurnScheduler:
+    """
+    One pending timer per room, kept in a heap and driven by a single asyncio
+    task. Re-triggering a room resets (or joins) its pending turn instead of
+    spawning another sleeper, and cancelling is O(1): superseded heap entries
+    are skipped lazily when they surface.
+    """
+
+    def __init__(self, fire, delay: float):
+        self._fire = fire # async callable(room_id)
+        self.delay = delay
+        self._heap = [] # (due, seq, room_id)
+        self._pending = {} # room_id -> seq of its live heap entry
+        self._seq = itertools.count()
+        self._loop = None
+        self._task = None
+        self._wakeup = None
+        self._running = set()
+        self.metrics = {"scheduled": 0, "reset": 0, "coalesced": 0, "fired": 0, "cancelled": 0, "errors": 0}
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """ Starts the timer loop on the running event loop (idempotent). """
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._running):
+            task.cancel()
+
+    # --- Public API (safe to call from worker threads) ---
+
+    def schedule(self, room_id: str, reset: bool = True, delay: float = None):
+        """
+        Arms the room's turn timer. With `reset`, a pending timer restarts from
+        now (a new utterance pushes the bot's reply back); without it, an
+        already-pending turn is kept as is (silence-breaker polls).
+        """
+        self._call(self._schedule, room_id, reset, self.delay if delay is None else delay)
+
+    def cancel(self, room_id: str):
+        """ Drops the room's pending turn, e.g. on barge-in. """
+        self._call(self._cancel, room_id)
+
+    def snapshot(self) -> dict:
+        return {**self.metrics, "pending": len(self._pending), "in_flight": len(self._running)}
+
+    # --- Internals (event loop thread only) ---
+
+    def _call(self, fn, *args):
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+
+        if self._task is None or self._task.done():
+            if current is None:
+                logger.warning("Turn scheduler is not running; dropping %s%s", fn.__name__, args)
+                return
+            self.start()
+
+        if current is self._loop:
+            fn(*args)
+        else:
+            self._loop.call_soon_threadsafe(fn, *args)
+
+    def _schedule(self, room_id: str, reset: bool, delay: float):
+        if room_id in self._pending:
+            if not reset:
+                self.metrics["coalesced"] += 1
+                return
+            self.metrics["reset"] += 1
+        else:
+            self.metrics["scheduled"] += 1
+
+        seq = next(self._seq)
+        self._pending[room_id] = seq
+        heapq.heappush(self._heap, (time.monotonic() + delay, seq, room_id))
+        self._wakeup.set()
+
+    def _cancel(self, room_id: str):
+        if self._pending.pop(room_id, None) is not None:
+            self.metrics["cancelled"] += 1
+
+    async def _run(self):
+        while True:
+            # Drop entries superseded by a reset or a cancel
+            while self._heap and self._pending.get(self._heap[0][2]) != self._heap[0][1]:
+                heapq.heappop(self._heap)
+
+            timeout = None
+            if self._heap:
+                timeout = self._heap[0][0] - time.monotonic()
+                if timeout <= 0:
+                    _, _, room_id = heapq.heappop(self._heap)
+                    del self._pending[room_id]
+                    self._spawn(room_id)
+                    continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _spawn(self, room_id: str):
+        self.metrics["fired"] += 1
+        task = self._loop.create_task(self._fire(room_id))
+        self._running.add(task)
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task):
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.metrics["errors"] += 1
+            logger.error(f"Scheduled task failed: {task.exception()}")
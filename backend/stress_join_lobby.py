@@ -0,0 +1,82 @@
+"""
+Concurrency test for atomic lobby seat reservation.
+
+Fires join-lobby for N simulated students at once (plus a second join for
+some of them, to exercise idempotent re-joins), then checks that no session
+holds more than LOBBY_SEAT_CAP students, every student got exactly one seat
+each session's seat counter matches its participant rows, and the joins
+were not fragmented into many partly filled sessions.
+Needs a reachable MONGODB_URI; uses its own lobby and removes it after.
+
+    python stress_join_lobby.py [students] [rejoins]
+"""
+import sys
+import uuid
+import time
+import asyncio
+from backend.config import settings
+from backend.database import get_async_database
+from backend.services.lobby import reserve_seat
+
+STUDENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+REJOINS = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+async def join_all(database, lobby, students):
+    async def join(participant_id):
+        return await reserve_seat(database, participant_id, f"peer-{participant_id}", "Stress Student", lobby=lobby)
+
+    # Everyone at once, then a burst of duplicate joins racing the first ones
+    first = [join(p) for p in students]
+    again = [join(p) for p in students[:REJOINS]]
+    return await asyncio.gather(*first, *again)
+
+async def verify(database, lobby, students):
+    sessions = await database["sessions"].find({"lobby": lobby}, {"_id": 0, "sessionId": 1, "seats": 1}).to_list()
+    session_ids = [s["sessionId"] for s in sessions]
+
+    cursor = await database["participants"].aggregate([
+        {"$match": {"sessionId": {"$in": session_ids}}},
+        {"$group": {"_id": "$sessionId", "n": {"$sum": 1}, "students": {"$addToSet": "$participantId"}}}
+    ])
+    rows = {row["_id"]: row async for row in cursor}
+
+    overfilled = [sid for sid, row in rows.items() if row["n"] > settings.LOBBY_SEAT_CAP]
+    seat_mismatch = [s["sessionId"] for s in sessions if s["seats"] != rows.get(s["sessionId"], {}).get("n", 0)]
+    seated = [p for row in rows.values() for p in row["students"]]
+    double_seated = len(seated) - len(set(seated))
+    unseated = len(set(students) - set(seated))
+    return sessions, overfilled, seat_mismatch, double_seated, unseated
+
+async def cleanup(database, lobby):
+    session_ids = [s["sessionId"] for s in await database["sessions"].find({"lobby": lobby}, {"sessionId": 1}).to_list()]
+    await database["participants"].delete_many({"sessionId": {"$in": session_ids}})
+    await database["sessions"].delete_many({"lobby": lobby})
+    await database["lobby_seats"].delete_many({"lobby": lobby})
+
+async def main():
+    database = get_async_database()
+    lobby = f"stress-{uuid.uuid4().hex[:8]}"
+    students = [f"stress-{uuid.uuid4().hex[:12]}" for _ in range(STUDENTS)]
+    print(f"{STUDENTS} students (+{REJOINS} re-joins) into lobby {lobby}, cap {settings.LOBBY_SEAT_CAP}")
+
+    try:
+        started = time.perf_counter()
+        await join_all(database, lobby, students)
+        elapsed = time.perf_counter() - started
+        print(f"Joined in {elapsed:.2f}s ({(STUDENTS + REJOINS) / elapsed:.0f} joins/s)")
+
+        sessions, overfilled, seat_mismatch, double_seated, unseated = await verify(database, lobby, students)
+        minimum = -(-STUDENTS // settings.LOBBY_SEAT_CAP)
+        fragmented = len(sessions) > minimum + max(2, minimum // 20) # Allow ~5% partly filled sessions
+        print(f"Sessions: {len(sessions)} (minimum possible {minimum})")
+        print(f"Overfilled: {len(overfilled)}, seat counter mismatches: {len(seat_mismatch)}, "
+              f"double-seated: {double_seated}, unseated: {unseated}, fragmented: {fragmented}")
+        if overfilled or seat_mismatch or double_seated or unseated or fragmented:
+            print("FAIL", overfilled[:5], seat_mismatch[:5])
+            sys.exit(1)
+        print("PASS")
+    finally:
+        await cleanup(database, lobby)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Multi-process stress test for the room turn lease + index compare-and-set.
+
+Spawns several worker processes that all hammer take_ai_turn on the same rooms
+at once, then checks that every script line was posted exactly once.
+Needs a reachable MONGODB_URI; creates its own rooms and removes them after.
+
+    python stress_turn_lease.py [processes] [rooms] [script_length]
+"""
+import sys
+import uuid
+import asyncio
+import multiprocessing
+from backend.database import get_database
+from backend.gd_schemas import ParticipantModel, ParticipantRole, RoomModel
+
+PROCESSES = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+ROOMS = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+SCRIPT_LENGTH = int(sys.argv[3]) if len(sys.argv) > 3 else 15
+TASKS_PER_ROOM = 4 # Concurrent turn attempts per room inside each process
+
+def setup(session_id):
+    db = get_database()
+    room_ids = []
+    for _ in range(ROOMS):
+        room_id = f"stress-{uuid.uuid4()}"
+        ai_peer = f"ai-{uuid.uuid4()}"
+        db["participants"].insert_one(ParticipantModel(
+            participantId=str(uuid.uuid4()), sessionId=session_id, peerId=ai_peer,
+            role=ParticipantRole.AI, name="AI Student", roomId=room_id
+        ).model_dump())
+        db["rooms"].insert_one(RoomModel(
+            roomId=room_id, sessionId=session_id, participants=[ai_peer], aiCount=1, topic="Stress",
+            script=[{"sentiment": "Neutral", "text": f"line {i}"} for i in range(SCRIPT_LENGTH)]
+        ).model_dump())
+        room_ids.append(room_id)
+    return room_ids
+
+def worker(room_ids):
+    from backend.services.ai_agent import take_ai_turn
+
+    async def hammer():
+        # Keep firing until every script is exhausted
+        for _ in range(SCRIPT_LENGTH * 3):
+            await asyncio.gather(*[take_ai_turn(r) for r in room_ids for _ in range(TASKS_PER_ROOM)])
+
+    asyncio.run(hammer())
+
+def verify(session_id, room_ids):
+    db = get_database()
+    duplicates = list(db["transcripts"].aggregate([
+        {"$match": {"sessionId": session_id}},
+        {"$group": {"_id": {"room": "$roomId", "line": "$scriptIndex"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}}
+    ]))
+    posted = db["transcripts"].count_documents({"sessionId": session_id})
+    indexes = [r.get("current_script_index") for r in db["rooms"].find({"roomId": {"$in": room_ids}})]
+    return posted, duplicates, indexes
+
+def cleanup(session_id):
+    db = get_database()
+    for col in ["transcripts", "participants", "rooms"]:
+        db[col].delete_many({"sessionId": session_id})
+
+if __name__ == "__main__":
+    session_id = f"stress-{uuid.uuid4().hex[:8]}"
+    room_ids = setup(session_id)
+    print(f"{PROCESSES} processes x {ROOMS} rooms x {SCRIPT_LENGTH} lines, session {session_id}")
+
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=worker, args=(room_ids,)) for _ in range(PROCESSES)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+    try:
+        posted, duplicates, indexes = verify(session_id, room_ids)
+        expected = ROOMS * SCRIPT_LENGTH
+        print(f"Posted {posted}/{expected} lines, duplicate turns: {len(duplicates)}")
+        print(f"Final indexes all at {SCRIPT_LENGTH}: {all(i == SCRIPT_LENGTH for i in indexes)}")
+        if duplicates or posted != expected:
+            print("FAIL", duplicates[:5])
+            sys.exit(1)
+        print("PASS")
+    finally:
+        cleanup(session_id)